@@ -2,15 +2,20 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import time
 import traceback
-import datetime
-from typing import Optional
+from typing import Any, Callable, Coroutine, Optional
 
 from discord import Intents
 import aiohttp
 import discord
 from discord.ext import commands
 
+from utils import metrics
+from utils.http import HTTPCache
+from utils.render import RenderPool, RenderQueueFull
+from utils.stats import CommandStatsWriter
+
 log = logging.getLogger(__name__)
 
 initial_extensions = (
@@ -43,10 +48,33 @@ class DDNet(commands.Bot):
         super().__init__(command_prefix='$', fetch_offline_members=True, help_command=commands.MinimalHelpCommand(), intents=Intents().all())
 
         self.config = kwargs.pop('config')
-        self.pool = kwargs.pop('pool')
+        self.pool = metrics.TimedPool(kwargs.pop('pool'))
         self.session = kwargs.pop('session')
+        self.http_cache = HTTPCache(self.session)
+
+        workers = self.config.getint('RENDER', 'WORKERS', fallback=2)
+        queue = self.config.getint('RENDER', 'QUEUE', fallback=8)
+        self.render_pool = RenderPool(workers, queue)
+
+        self.command_stats = CommandStatsWriter(self.pool)
+
+        self.metrics_server = None
+        metrics.gateway_latency.set_function(lambda: self.latency)
 
     async def setup_hook(self):
+        self.loop.create_task(self.render_pool.warmup())
+        self.command_stats.start()
+
+        port = self.config.get('METRICS', 'PORT', fallback='')
+        if port:
+            host = self.config.get('METRICS', 'HOST', fallback='127.0.0.1')
+            self.metrics_server = metrics.MetricsServer(host, int(port))
+            try:
+                await self.metrics_server.start()
+            except OSError:
+                log.exception('Failed to start metrics server')
+                self.metrics_server = None
+
         for extension in initial_extensions:
             try:
                 await self.load_extension(extension)
@@ -70,13 +98,32 @@ class DDNet(commands.Bot):
     async def close(self):
         log.info('Closing')
         await super().close()
+        await self.command_stats.close()
         await self.pool.close()
         await self.session.close()
+        self.render_pool.shutdown()
+        if self.metrics_server is not None:
+            await self.metrics_server.close()
 
     async def on_message(self, message: discord.Message):
         await self.wait_until_ready()
         await self.process_commands(message)
 
+    async def _run_event(self, coro: Callable[..., Coroutine[Any, Any, Any]], event_name: str, *args: Any,
+                         **kwargs: Any):
+        with metrics.event_duration.time(event_name, coro.__qualname__):
+            await super()._run_event(coro, event_name, *args, **kwargs)
+
+    async def invoke(self, ctx: commands.Context):
+        if ctx.command is None:
+            return await super().invoke(ctx)
+
+        start = time.perf_counter()
+        try:
+            await super().invoke(ctx)
+        finally:
+            metrics.command_duration.observe(time.perf_counter() - start, ctx.command.qualified_name)
+
     def global_check(self, ctx: commands.Context) -> bool:
         return ctx.guild is None or ctx.channel.permissions_for(ctx.guild.me).send_messages
 
@@ -90,19 +137,14 @@ class DDNet(commands.Bot):
 
         log.info('%s used command in %s: %s', ctx.author, destination, ctx.message.content)
 
-        query = """INSERT INTO stats_commands (guild_id, channel_id, author_id, timestamp, command)
-                   VALUES ($1, $2, $3, $4, $5);
-                """
-        values = (
+        self.command_stats.add(
             guild_id,
             ctx.channel.id,
             ctx.author.id,
-            datetime.datetime.fromisoformat(ctx.message.created_at.replace(tzinfo=None).isoformat()),
+            ctx.message.created_at.replace(tzinfo=None),
             ctx.command.qualified_name
         )
 
-        await self.pool.execute(query, *values)
-
     async def on_command_error(self, ctx: commands.Context, error: commands.CommandError):
         command = ctx.command
 
@@ -114,6 +156,8 @@ class DDNet(commands.Bot):
                 msg = 'I do not have proper permission'
             elif isinstance(error.original, discord.HTTPException) and error.original.code == 40005:
                 msg = 'File is too large to upload'
+            elif isinstance(error.original, RenderQueueFull):
+                msg = 'Too many images are being rendered right now, try again in a bit'
             else:
                 trace = get_traceback(error.original)
                 log.error('Command %r caused an exception\n%s', command.qualified_name, trace)
@@ -6,12 +6,10 @@ from typing import List
 
 import discord
 from discord.ext import commands
-from PIL import Image, ImageDraw, ImageFont
+from PIL import ImageDraw, ImageFont
 
+from utils.assets import assets
 from utils.image import save, wrap_new
-from utils.misc import executor
-
-DIR = 'data/assets'
 
 
 def wrap(font: ImageFont, text: str, line_width: int) -> str:
@@ -47,10 +45,10 @@ def check_text_length(text1: str, text2: str = None, max_chars: int = 110) -> Li
     return errors
 
 
-async def render(name: str, text1: str, text2: str = None) -> BytesIO:
-    base = Image.open(f'{DIR}/memes/{name}.png')
+def render(name: str, text1: str, text2: str = None) -> BytesIO:
+    base = assets.image(f'memes/{name}')
     canv = ImageDraw.Draw(base)
-    font = ImageFont.truetype(f'{DIR}/fonts/normal.ttf', 46)
+    font = assets.font('normal', 46)
 
     canv.text((570, 70), wrap(font, text1, 400), fill='black', font=font)
     if text2 is not None:
@@ -59,10 +57,10 @@ async def render(name: str, text1: str, text2: str = None) -> BytesIO:
     return save(base)
 
 
-async def render_teebob(text: str) -> BytesIO:
-    base = Image.open(f'{DIR}/memes/teebob.png')
+def render_teebob(text: str) -> BytesIO:
+    base = assets.image('memes/teebob')
     canv = ImageDraw.Draw(base)
-    font = ImageFont.truetype(f'{DIR}/fonts/normal.ttf', 40)
+    font = assets.font('normal', 40)
 
     box = ((100, 110), (360, 370))
     wrap_new(canv, box, text, font=font)
@@ -70,10 +68,10 @@ async def render_teebob(text: str) -> BytesIO:
     return save(base)
 
 
-async def render_clown(text1: str, text2: str, text3: str, text4: str) -> BytesIO:
-    base = Image.open(f'{DIR}/memes/clown.png')
+def render_clown(text1: str, text2: str, text3: str, text4: str) -> BytesIO:
+    base = assets.image('memes/clown')
     canv = ImageDraw.Draw(base)
-    font = ImageFont.truetype(f'{DIR}/fonts/normal.ttf', 30)
+    font = assets.font('normal', 30)
 
     canv.text((10, 10), wrap(font, text1, 310), fill='black', font=font)
     canv.text((10, 180), wrap(font, text2, 310), fill='black', font=font)
@@ -94,7 +92,7 @@ class Memes(commands.Cog):
             for error in errors:
                 await ctx.send(error)
             return
-        buf = await render('angry', text1, text2)
+        buf = await self.bot.render_pool.run(render, 'angry', text1, text2)
         file = discord.File(buf, filename='angry.png')
         await ctx.send(file=file)
 
@@ -105,7 +103,7 @@ class Memes(commands.Cog):
             for error in errors:
                 await ctx.send(error)
             return
-        buf = await render('drake', text1, text2)
+        buf = await self.bot.render_pool.run(render, 'drake', text1, text2)
         file = discord.File(buf, filename='drake.png')
         await ctx.send(file=file)
 
@@ -116,7 +114,7 @@ class Memes(commands.Cog):
             for error in errors:
                 await ctx.send(error)
             return
-        buf = await render('happy', text1, text2)
+        buf = await self.bot.render_pool.run(render, 'happy', text1, text2)
         file = discord.File(buf, filename='happy.png')
         await ctx.send(file=file)
 
@@ -128,7 +126,7 @@ class Memes(commands.Cog):
             for error in errors:
                 await ctx.send(error)
             return
-        buf = await render('sleep', text1, text2)
+        buf = await self.bot.render_pool.run(render, 'sleep', text1, text2)
         file = discord.File(buf, filename='sleep.png')
         await ctx.send(file=file)
 
@@ -139,19 +137,19 @@ class Memes(commands.Cog):
             for error in errors:
                 await ctx.send(error)
             return
-        buf = await render('teeward', text1, text2)
+        buf = await self.bot.render_pool.run(render, 'teeward', text1, text2)
         file = discord.File(buf, filename='teeward.png')
         await ctx.send(file=file)
 
     @commands.command()
     async def teebob(self, ctx: commands.Context, *, text: str):
-        buf = await render_teebob(text)
+        buf = await self.bot.render_pool.run(render_teebob, text)
         file = discord.File(buf, filename='teebob.png')
         await ctx.send(file=file)
 
     @commands.command()
     async def clown(self, ctx: commands.Context, text1: str, text2: str, text3: str, text4: str):
-        buf = await render_clown(text1, text2, text3, text4)
+        buf = await self.bot.render_pool.run(render_clown, text1, text2, text3, text4)
         file = discord.File(buf, filename='clown.png')
         await ctx.send(file=file)
 
@@ -5,6 +5,7 @@ import logging
 import zipfile
 from datetime import datetime, timedelta
 from io import BytesIO
+from typing import Literal, Optional
 
 import discord
 import psutil
@@ -12,7 +13,7 @@ from discord.ext import commands
 
 from data.countryflags import FLAG_UNK
 from utils.misc import run_process_shell
-from utils.text import human_timedelta
+from utils.text import human_timedelta, plural
 
 log = logging.getLogger(__name__)
 
@@ -61,18 +62,44 @@ class Misc(commands.Cog):
         await ctx.send(embed=embed)
 
     @commands.command()
-    async def commandstats(self, ctx: commands.Context):
-        """Shows command stats"""
-        query = 'SELECT command, COUNT(*) AS uses FROM stats_commands GROUP BY command ORDER BY uses DESC;'
-        stats = await self.bot.pool.fetch(query)
+    async def commandstats(self, ctx: commands.Context, scope: Optional[Literal['guild', 'channel']]=None,
+                           days: Optional[int]=None):
+        """Shows command stats, optionally only for this guild or channel and the last few days"""
+        conditions = []
+        args = []
+        title = 'Command Stats'
+        if scope == 'guild':
+            args.append(0 if ctx.guild is None else ctx.guild.id)
+            conditions.append(f'guild_id = ${len(args)}')
+            title += ' (this guild)' if ctx.guild is not None else ' (private messages)'
+        elif scope == 'channel':
+            args.append(ctx.channel.id)
+            conditions.append(f'channel_id = ${len(args)}')
+            title += ' (this channel)'
+
+        if days is not None:
+            if days < 1:
+                return await ctx.send('Days need to be at least 1')
+
+            args.append(datetime.utcnow().date() - timedelta(days=days - 1))
+            conditions.append(f'day >= ${len(args)}')
+            title += f' (last {days}{plural(days, " day")})'
+
+        where = f'WHERE {" AND ".join(conditions)}' if conditions else ''
+        query = f"""SELECT command, SUM(uses) AS uses FROM stats_commands_daily {where}
+                    GROUP BY command ORDER BY uses DESC;
+                 """
+        stats = await self.bot.pool.fetch(query, *args)
         stats = [s for s in stats if self.bot.get_command(s['command']) is not None]
+        if not stats:
+            return await ctx.send('No commands have been used yet')
 
         prefix = self.bot.command_prefix
         width = len(max((s['command'] for s in stats[:20]), key=len))
         desc = '\n'.join(f'`{prefix}{c}{"." * (width - len(c))}:` {u}' for c, u in stats[:20])
         total = sum(s['uses'] for s in stats)
 
-        embed = discord.Embed(title='Command Stats', description=desc, color=discord.Color.blurple())
+        embed = discord.Embed(title=title, description=desc, color=discord.Color.blurple())
         embed.set_footer(text=f'{total} total')
 
         await ctx.send(embed=embed)
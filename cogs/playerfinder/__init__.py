@@ -0,0 +1,405 @@
+import discord
+from discord.ext import commands, tasks
+
+import hashlib
+import json
+import time
+from datetime import datetime, timezone
+from io import BytesIO
+
+from cogs.playerfinder.presence import PresenceTracker
+from cogs.playerfinder.search import TrigramIndex
+from cogs.playerfinder.snapshot import Snapshot
+from cogs.playerfinder.watchlist import Watchlist
+from utils.misc import write_json_atomic
+
+GUILD_DDNET       = 252358080522747904
+ROLE_MODERATOR    = 252523225810993153
+ROLE_ADMIN        = 293495272892399616
+CHAN_PLAYERFINDER = 1078979471761211462
+
+SERVERS_MAX_AGE = 10      # seconds a master server response is reused for
+SERVERS_INFO_MAX_AGE = 300
+
+
+def is_staff(member: discord.Member) -> bool:
+    return any(r.id in (ROLE_ADMIN, ROLE_MODERATOR) for r in member.roles)
+
+
+def check_conditions(ctx) -> bool:
+    return ctx.guild is None or ctx.guild.id != GUILD_DDNET or ctx.channel.id != CHAN_PLAYERFINDER \
+           or not is_staff(ctx.author)
+
+
+class PlayerFinder(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+        self.servers_url = "https://master1.ddnet.tw/ddnet/15/servers.json"
+        self.servers_info_url = 'https://info.ddnet.org/info'
+        self.watchlist = Watchlist("data/find_players.json")
+        self.message_file = "data/find_players_message.json"
+        self.players_online_filtered = {}
+        self.message_id = self.load_message_id()
+        self.message_digest = None
+        self.snapshot = None
+        self._snapshot_key = None
+        self.player_index = TrigramIndex()
+        self.clan_index = TrigramIndex()
+        self.presence = PresenceTracker()
+
+    def cog_unload(self) -> None:
+        self.find_players.cancel()
+        self.watchlist.flush()
+
+    def cog_load(self) -> None:
+        self.find_players.start()
+
+    async def server_filter(self) -> set:
+        gamemodes = ['DDNet', 'Test', 'Tutorial', 'Block', 'Infection',
+                     'iCTF', 'gCTF', 'Vanilla', 'zCatch', 'TeeWare',
+                     'TeeSmash', 'Foot', 'xPanic', 'Monster']
+        servers = await self.bot.http_cache.get_json(self.servers_info_url, ttl=SERVERS_INFO_MAX_AGE)
+        data = servers.get('servers')
+        ddnet_ips = set()
+        for i in data:
+            sv_list = i.get('servers')
+            for mode in gamemodes:
+                server_lists = sv_list.get(mode)
+                if server_lists is not None:
+                    ddnet_ips.update(server_lists)
+        return ddnet_ips
+
+    async def get_snapshot(self) -> Snapshot:
+        # only rebuilt when one of the two responses actually changed
+        servers = await self.bot.http_cache.get(self.servers_url, ttl=SERVERS_MAX_AGE)
+        info = await self.bot.http_cache.get(self.servers_info_url, ttl=SERVERS_INFO_MAX_AGE)
+
+        key = (servers.generation, info.generation)
+        if self.snapshot is None or key != self._snapshot_key:
+            self.snapshot = Snapshot(servers.data, await self.server_filter())
+            self._snapshot_key = key
+            self.player_index.update(self.snapshot.players)
+            self.clan_index.update(self.snapshot.clans)
+
+        return self.snapshot
+
+    def load_message_id(self):
+        try:
+            with open(self.message_file, 'r', encoding='utf-8') as f:
+                return json.load(f).get('message_id')
+        except (OSError, ValueError):
+            return None
+
+    def save_message_id(self):
+        write_json_atomic(self.message_file, {'message_id': self.message_id})
+
+    async def send_message(self, embed):
+        digest = hashlib.sha1(json.dumps(embed.to_dict(), sort_keys=True).encode()).hexdigest()
+        channel = self.bot.get_channel(CHAN_PLAYERFINDER)
+
+        if self.message_id is not None:
+            message = channel.get_partial_message(self.message_id)
+            if channel.last_message_id == self.message_id:
+                if digest == self.message_digest:
+                    return
+
+                try:
+                    await message.edit(embed=embed)
+                except discord.NotFound:
+                    pass
+                else:
+                    self.message_digest = digest
+                    return
+            else:
+                # someone wrote below the embed, move it back to the bottom
+                try:
+                    await message.delete()
+                except discord.NotFound:
+                    pass
+
+        message = await channel.send(embed=embed)
+        self.message_id = message.id
+        self.message_digest = digest
+        self.save_message_id()
+
+    @commands.command(name='list', hidden=True)
+    async def send_player_list(self, ctx: commands.Context):
+        """
+        Uploads a text file containing all players currently in the search list.
+        """
+        if check_conditions(ctx):
+            return
+
+        if not self.watchlist:
+            await ctx.send('No players found.')
+        else:
+            response = "Current List:\n"
+            for i, (player, reason) in enumerate(self.watchlist.items(), start=1):
+                response += f"{i}. \"{player}\" for reason: {reason}\n"
+
+            buf = BytesIO(response.encode('utf-8'))
+            await ctx.send(file=discord.File(buf, 'player_list.txt'))
+
+    @commands.command(name='add', hidden=True)
+    async def add_player_to_list(self, ctx: commands.Context, *, players: str):
+        """
+        Adds a player to the search list. Example:
+        $add
+        nameless tee
+        blocker
+        """
+        if check_conditions(ctx):
+            return
+
+        new_players = {}
+        player_info = players.split("\n")
+        for i in range(0, len(player_info), 2):
+            player_name = player_info[i].strip()
+            reason = player_info[i + 1].strip() if i + 1 < len(player_info) else "No reason provided"
+            if player_name in self.watchlist:
+                await ctx.send(f'Player {player_name} is already in the search list')
+            else:
+                new_players[player_name] = reason
+                self.watchlist.set(player_name, reason)
+
+        if new_players:
+            message = "Added players:"
+            for player, reason in new_players.items():
+                message += f"\n{player}: {reason}"
+            await ctx.send(message)
+
+    @commands.command(name='rm', hidden=True)
+    async def remove_player_from_list(self, ctx: commands.Context, *, player_names: str):
+        """
+        Removes a player from the watch list. Example:
+        $rm
+        player1
+        player2
+        player3
+        """
+        if check_conditions(ctx):
+            return
+
+        removed_players = []
+        for player_name in player_names.split("\n"):
+            player_name = player_name.strip()
+            if self.watchlist.remove(player_name):
+                removed_players.append(player_name)
+            else:
+                await ctx.send(f'Player {player_name} not found.')
+        if removed_players:
+            await ctx.send(f'Removed players:\n{", ".join(removed_players)}.')
+            self.players_online_filtered.clear()
+
+    @commands.command(name='info', hidden=True)
+    async def send_info(self, ctx: commands.Context, *, player_name: str):
+        """
+        Sends the info field of the provided player. Example:
+        $info
+        player1
+        """
+        if check_conditions(ctx):
+            return
+
+        matched_players = [name for name in self.watchlist if name.strip() == player_name.strip()]
+
+        if not matched_players:
+            await ctx.send(f'Player not in watchlist.')
+        else:
+            player_name = matched_players[0]
+            reason = self.watchlist.get(player_name, "No reason provided")
+            await ctx.send(f"{player_name} was added with Reason: {reason}")
+
+    @commands.command(hidden=True)
+    async def edit_info(self, ctx: commands.Context, *, player_reason: str):
+        """
+        Edits the info field of the given player. Example:
+        $edit_info
+        player1
+        <new reason>
+        """
+        if check_conditions(ctx):
+            return
+        lines = player_reason.strip().split('\n')
+        player_name = lines[0].strip()
+        reason = '\n'.join(lines[1:]).strip()
+
+        if player_name not in self.watchlist:
+            await ctx.send(f'Player {player_name} not found.')
+        else:
+            self.watchlist.set(player_name, reason)
+            await ctx.send(f'Reason for {player_name} updated to:\n{reason}')
+
+    @commands.command(name='clear', hidden=True)
+    async def clear_entire_players_list(self, ctx: commands.Context):
+        """
+        This command will clear the entire watch list. Careful!
+        """
+        if check_conditions(ctx):
+            return
+
+        self.watchlist.clear()
+        await ctx.send('Player list cleared.')
+
+    @commands.command(name='find')
+    async def search_player(self, ctx, player_name):
+        snapshot = await self.get_snapshot()
+        matches = {player_name: snapshot.find(player_name)} if player_name in snapshot.players \
+            else snapshot.find_casefold(player_name)
+
+        if not matches:
+            return await ctx.send(f"There is currently no player online with the name \"{player_name}\"")
+
+        message = ""
+        for name, player_info in matches.items():
+            message += f"Found {len(player_info)} server(s) with \"{name}\" currently playing:\n"
+            for i, server in enumerate(player_info, 1):
+                server_name, server_address = server
+                message += f"{i}. Server: {server_name} — Link: <https://ddnet.org/connect-to/?addr={server_address}/>\n"
+        await ctx.send(message)
+
+    @commands.command(name='search')
+    async def search_players(self, ctx, *, query: str):
+        """
+        Searches online players and clans by partial or misspelled name. Example:
+        $search namless
+        """
+        snapshot = await self.get_snapshot()
+        players = self.player_index.search(query, limit=10)
+        clans = self.clan_index.search(query, limit=5)
+
+        if not players and not clans:
+            return await ctx.send(f"There is currently no player or clan online matching \"{query}\"")
+
+        message = ""
+        if players:
+            message += "Players:\n"
+            for i, (_, name) in enumerate(players, 1):
+                message += f"{i}. {name}"
+                for server_name, server_address in snapshot.find(name)[:1]:
+                    message += f" — Server: {server_name} — " \
+                               f"Link: <https://ddnet.org/connect-to/?addr={server_address}/>"
+                message += "\n"
+        if clans:
+            message += "Clans:\n"
+            for i, (_, clan) in enumerate(clans, 1):
+                members = sorted(snapshot.clans[clan])
+                message += f"{i}. {clan} — {len(members)} online: {', '.join(members[:10])}\n"
+
+        await ctx.send(discord.utils.escape_mentions(message)[:2000])
+
+    @commands.command(name='seen', hidden=True)
+    async def last_seen(self, ctx: commands.Context, *, player_name: str):
+        """
+        Shows when a player on the watch list was last seen and how long they played in the last 24 hours. Example:
+        $seen nameless tee
+        """
+        if check_conditions(ctx):
+            return
+
+        player_name = player_name.strip()
+        if player_name not in self.watchlist:
+            return await ctx.send('Player not in watchlist.')
+
+        now = time.time()
+        online = self.presence.time_online(player_name, now - 24 * 60 * 60, now)
+        hours, minutes = divmod(int(online) // 60, 60)
+        played = f'Online for {hours}h {minutes}m in the last 24 hours.'
+
+        current = self.presence.current(player_name)
+        last_seen = self.presence.last_seen(player_name)
+        if current is not None:
+            server_name, address = current
+            message = f'{player_name} is online on {server_name} <https://ddnet.org/connect-to/?addr={address}/>'
+        elif last_seen is not None:
+            seen = discord.utils.format_dt(datetime.fromtimestamp(last_seen, timezone.utc), 'R')
+            message = f'{player_name} was last seen {seen}'
+        else:
+            message = f'{player_name} has not been seen since the search started'
+
+        await ctx.send(f'{message}\n{played}')
+
+    @tasks.loop(seconds=30)
+    async def find_players(self):
+        snapshot = await self.get_snapshot()
+
+        for event, *args in self.presence.update(snapshot, self.watchlist):
+            self.bot.dispatch(event, *args)
+
+        self.players_online_filtered = {}
+        for player_name in self.watchlist:
+            servers = snapshot.find(player_name)
+            if any(snapshot.is_filtered(server) for server in servers):
+                self.players_online_filtered[player_name] = [s for s in servers[:3] if snapshot.is_filtered(s)]
+
+        player_embed = discord.Embed(color=0x00ff00)
+        if self.players_online_filtered:
+            player_embed.title = 'Found players'
+            for i, player_name in enumerate(self.players_online_filtered.keys(), start=1):
+                servers = self.players_online_filtered[player_name]
+                server_field_value = ""
+                reason = self.watchlist.get(player_name, 'No reason provided')
+                server_field_value += f'Reason: {reason}\n'
+
+                for server in servers:
+                    server_name, address = server
+                    server_field_value += (
+                        f"* Server: {server_name}"
+                        f"\n * <https://ddnet.org/connect-to/?addr={address}/>\n"
+                    )
+
+                player_embed.add_field(
+                    name=f"{i}. Player: {player_name}",
+                    value=server_field_value,
+                    inline=False
+                )
+        else:
+            player_embed.title = 'No players found in the current iteration.'
+
+        await self.send_message(player_embed)
+
+    @find_players.before_loop
+    async def before_find_players(self):
+        await self.bot.wait_until_ready()
+
+    @commands.command(name="stop_search", hidden=True)
+    async def stop_player_search(self, ctx: commands.Context):
+        """
+        This command stops the player finder task.
+        """
+        if check_conditions(ctx):
+            return
+
+        if not self.find_players.is_running():
+            await ctx.send("The player search process is not currently running.")
+        else:
+            if self.message_id is not None:
+                try:
+                    await ctx.channel.get_partial_message(self.message_id).delete()
+                except discord.NotFound:
+                    pass
+                self.message_id = None
+                self.message_digest = None
+                self.save_message_id()
+            self.find_players.cancel()
+            self.players_online_filtered.clear()
+            self.presence.reset()
+            await ctx.send("Process stopped.")
+
+    @commands.command(name='start_search', hidden=True)
+    async def start_player_search(self, ctx: commands.Context):
+        """
+        This command starts the player finder task.
+        """
+        if check_conditions(ctx):
+            return
+
+        if self.find_players.is_running():
+            await ctx.send("The player search process is already running.")
+        else:
+            self.find_players.start()
+            await ctx.send("Initializing search...")
+
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(PlayerFinder(bot))
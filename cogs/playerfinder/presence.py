@@ -0,0 +1,87 @@
+import time
+from collections import deque
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+from cogs.playerfinder.snapshot import Server, Snapshot
+
+HISTORY_SIZE = 64
+
+Event = Tuple  # (event name, *args) as passed to bot.dispatch
+
+
+class PresenceTracker:
+    """Turns consecutive snapshots into join, leave and server switch events for the watched players.
+
+    Only the current server of every watched player is kept between polls. The last `HISTORY_SIZE` sessions per player
+    are kept for "last seen" and "time online" queries.
+    """
+
+    def __init__(self):
+        self._online: Dict[str, Server] = {}
+        # [joined, left or None while online, server name, address]
+        self._sessions: Dict[str, Deque[list]] = {}
+
+    def update(self, snapshot: Snapshot, names: Iterable[str], now: Optional[float] = None) -> List[Event]:
+        now = time.time() if now is None else now
+        names = set(names)
+        events = []
+
+        for name in self._online.keys() - names:
+            self._close(name, now)
+            del self._online[name]
+        for name in self._sessions.keys() - names:
+            del self._sessions[name]
+
+        for name in names:
+            servers = snapshot.find(name)
+            current = servers[0] if servers else None
+            previous = self._online.get(name)
+
+            if previous == current or (previous is not None and current is not None and previous[1] == current[1]):
+                continue
+
+            if previous is not None:
+                self._close(name, now)
+
+            if current is None:
+                del self._online[name]
+                events.append(('player_leave', name, previous))
+            else:
+                self._online[name] = current
+                sessions = self._sessions.setdefault(name, deque(maxlen=HISTORY_SIZE))
+                sessions.append([now, None, *current])
+                if previous is None:
+                    events.append(('player_join', name, current))
+                else:
+                    events.append(('player_switch', name, previous, current))
+
+        return events
+
+    def _close(self, name: str, now: float):
+        sessions = self._sessions.get(name)
+        if sessions and sessions[-1][1] is None:
+            sessions[-1][1] = now
+
+    def reset(self, now: Optional[float] = None):
+        # the loop stopped, nobody can be considered online until the next poll
+        now = time.time() if now is None else now
+        for name in self._online:
+            self._close(name, now)
+        self._online.clear()
+
+    def current(self, name: str) -> Optional[Server]:
+        return self._online.get(name)
+
+    def last_seen(self, name: str) -> Optional[float]:
+        # None if the player is online right now or was never seen
+        sessions = self._sessions.get(name)
+        if not sessions:
+            return None
+        return sessions[-1][1]
+
+    def time_online(self, name: str, since: float, now: Optional[float] = None) -> float:
+        now = time.time() if now is None else now
+        total = 0.0
+        for joined, left, *_ in self._sessions.get(name, ()):
+            total += max(0.0, (now if left is None else left) - max(joined, since))
+        return total
@@ -0,0 +1,154 @@
+import heapq
+import itertools
+import math
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Set, Tuple
+
+MIN_SIMILARITY = 0.3
+# upper bound on the strings scored per query, keeps very common trigrams and one letter queries cheap
+MAX_CANDIDATES = 500
+# one or two characters match a large part of all names, only the shortest ones can rank high anyway
+MAX_SHORT_CANDIDATES = 200
+
+
+def trigrams(text: str) -> Set[str]:
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def short_keys(text: str) -> Set[str]:
+    # every substring of one or two characters, queries that short only have padded trigrams
+    return {text[i:i + n] for n in (1, 2) for i in range(len(text) - n + 1)}
+
+
+class TrigramIndex:
+    """Case-insensitive substring and typo-tolerant lookup over a set of strings.
+
+    `update` only touches the postings of strings that were added or removed since the last call, consecutive master
+    server snapshots mostly contain the same names.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Set[str]] = defaultdict(set)        # trigram -> folded strings
+        self._short: Dict[str, Set[str]] = defaultdict(set)           # 1-2 character substring -> folded strings
+        self._short_prefixes: Dict[str, Set[str]] = defaultdict(set)  # 1-2 character prefix -> folded strings
+        self._sizes: Dict[str, int] = {}                               # folded string -> number of trigrams
+        self._originals: Dict[str, Set[str]] = {}                      # folded string -> original spellings
+
+    def __len__(self) -> int:
+        return len(self._originals)
+
+    @staticmethod
+    def _discard(postings: Dict[str, Set[str]], keys: Iterable[str], term: str):
+        for key in keys:
+            terms = postings[key]
+            terms.discard(term)
+            if not terms:
+                del postings[key]
+
+    def update(self, values: Iterable[str]):
+        originals = defaultdict(set)
+        for value in values:
+            originals[value.casefold()].add(value)
+
+        for term in self._sizes.keys() - originals.keys():
+            self._discard(self._postings, trigrams(term), term)
+            self._discard(self._short, short_keys(term), term)
+            self._discard(self._short_prefixes, {term[:1], term[:2]}, term)
+            del self._sizes[term]
+
+        for term in originals.keys() - self._sizes.keys():
+            grams = trigrams(term)
+            for gram in grams:
+                self._postings[gram].add(term)
+            for key in short_keys(term):
+                self._short[key].add(term)
+            for key in {term[:1], term[:2]}:
+                self._short_prefixes[key].add(term)
+            self._sizes[term] = len(grams)
+
+        self._originals = dict(originals)
+
+    def _score(self, query: str, grams: Set[str], term: str, count: int) -> float:
+        score = 2 * count / (len(grams) + self._sizes[term])
+        if term == query:
+            score += 3
+        elif term.startswith(query):
+            score += 2
+        elif query in term:
+            score += 1
+        return score
+
+    def _candidates(self, query: str, grams: Set[str]) -> Counter:
+        """Counts the shared trigrams of the strings that can still reach MIN_SIMILARITY or contain the query."""
+        # anything with fewer shared trigrams can neither contain the query nor be similar enough
+        inner = max(len(query) - 2, 1)
+        least = max(math.ceil(min(inner, MIN_SIMILARITY * (len(grams) + 1) / 2)), 1)
+
+        # a string sharing `least` trigrams shares one of the rarest len(grams) - least + 1, only those add candidates
+        ordered = sorted(grams, key=lambda g: len(self._postings.get(g, ())))
+        seeds = len(ordered) - least + 1
+
+        common = Counter()
+        if query in self._sizes:
+            common[query] = 0
+
+        for i, gram in enumerate(ordered):
+            postings = self._postings.get(gram, ())
+            if i < seeds and len(common) + len(postings) <= MAX_CANDIDATES:
+                common.update(postings)
+                continue
+
+            # past the cap only as many new strings as still fit are added, the others can only count up
+            new = []
+            if i < seeds:
+                room = MAX_CANDIDATES - len(common)
+                new = list(itertools.islice((t for t in postings if t not in common), max(room, 0)))
+
+            for term in common:
+                if term in postings:
+                    common[term] += 1
+            common.update(new)
+
+        return Counter({t: c for t, c in common.items() if c >= least})
+
+    def _search_short(self, query: str, grams: Set[str]) -> List[Tuple[float, str]]:
+        # prefix matches go in first so that the cap only ever cuts off substring matches
+        terms = set(itertools.islice(self._short_prefixes.get(query, ()), MAX_SHORT_CANDIDATES))
+        if query in self._sizes:
+            terms.add(query)
+        for term in self._short.get(query, ()):
+            if len(terms) >= MAX_SHORT_CANDIDATES:
+                break
+            terms.add(term)
+
+        scored = []
+        for term in terms:
+            padded = f' {term} '
+            scored.append((self._score(query, grams, term, sum(gram in padded for gram in grams)), term))
+
+        return scored
+
+    def search(self, query: str, limit: int = 10) -> List[Tuple[float, str]]:
+        """Returns up to `limit` (score, original) pairs, best first.
+
+        Exact matches rank above prefix matches, which rank above substring matches, ties and the remaining fuzzy
+        matches are ordered by trigram similarity.
+        """
+        query = query.casefold()
+        grams = trigrams(query)
+
+        if len(query) < 3:
+            scored = self._search_short(query, grams)
+        else:
+            scored = []
+            for term, count in self._candidates(query, grams).items():
+                score = self._score(query, grams, term, count)
+                if score >= MIN_SIMILARITY:
+                    scored.append((score, term))
+
+        results = []
+        for score, term in heapq.nlargest(limit, scored):
+            results.extend((score, original) for original in sorted(self._originals[term]))
+
+        return results[:limit]
@@ -0,0 +1,73 @@
+import bisect
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+ADDRESS = re.compile(r"tw-0.6\+udp://([\d\.]+):(\d+)")
+
+Server = Tuple[str, str]  # (server name, ip:port)
+
+
+def format_address(address: str) -> Optional[str]:
+    address_match = ADDRESS.match(address)
+    if address_match:
+        ip, port = address_match.groups()
+        return f"{ip}:{port}"
+    return None
+
+
+class Snapshot:
+    """The players on the master server list at one point in time, indexed by name.
+
+    `filtered` are the addresses of the DDNet servers the watch list cares about.
+    """
+
+    def __init__(self, servers: dict, filtered: Iterable[str] = ()):
+        self.filtered = frozenset(filtered)
+
+        players = defaultdict(list)
+        clans = defaultdict(set)
+        for server in servers.get("servers", ()):
+            info = server["info"]
+            clients = info.get("clients")
+            if not clients:
+                continue
+
+            addresses = [a for a in map(format_address, server["addresses"]) if a is not None]
+            entries = [(info["name"], a) for a in addresses]
+            for player in clients:
+                players[player["name"]].extend(entries)
+                if player.get("clan"):
+                    clans[player["clan"]].add(player["name"])
+
+        self.players: Dict[str, List[Server]] = dict(players)
+        self.clans: Dict[str, Set[str]] = dict(clans)
+
+        folded = defaultdict(list)
+        for name in self.players:
+            folded[name.casefold()].append(name)
+
+        self._folded = dict(folded)
+        self._sorted = sorted(self._folded)
+
+    def __len__(self) -> int:
+        return len(self.players)
+
+    def find(self, name: str) -> List[Server]:
+        return self.players.get(name, [])
+
+    def is_filtered(self, server: Server) -> bool:
+        return server[1] in self.filtered
+
+    def find_casefold(self, name: str) -> Dict[str, List[Server]]:
+        return {n: self.players[n] for n in self._folded.get(name.casefold(), ())}
+
+    def find_prefix(self, prefix: str, limit: int = 25) -> List[str]:
+        prefix = prefix.casefold()
+        names = []
+        for folded in self._sorted[bisect.bisect_left(self._sorted, prefix):]:
+            if not folded.startswith(prefix) or len(names) >= limit:
+                break
+            names.extend(self._folded[folded])
+
+        return names[:limit]
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import logging
+from typing import Dict, Iterator, Optional
+
+from utils.misc import write_json_atomic
+
+log = logging.getLogger(__name__)
+
+
+class Watchlist:
+    """The watched player names and the reason they were added for.
+
+    Lives in memory, changes are written back to `path` after `delay` seconds so that a burst of commands results in a
+    single write. `flush` writes immediately.
+    """
+
+    def __init__(self, path: str, *, delay: float = 5.0):
+        self.path = path
+        self.delay = delay
+        self._players = self.load()
+        self._dirty = False
+        self._save_task = None
+
+    def load(self) -> Dict[str, str]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._players
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._players)
+
+    def __len__(self) -> int:
+        return len(self._players)
+
+    def items(self):
+        return self._players.items()
+
+    def get(self, name: str, default: Optional[str] = None) -> Optional[str]:
+        return self._players.get(name, default)
+
+    def set(self, name: str, reason: str):
+        self._players[name] = reason
+        self._changed()
+
+    def remove(self, name: str) -> bool:
+        if self._players.pop(name, None) is None:
+            return False
+        self._changed()
+        return True
+
+    def clear(self):
+        self._players.clear()
+        self._changed()
+
+    def _changed(self):
+        self._dirty = True
+        if self._save_task is None or self._save_task.done():
+            self._save_task = asyncio.ensure_future(self._save_later())
+
+    async def _save_later(self):
+        await asyncio.sleep(self.delay)
+        self.flush()
+
+    def flush(self):
+        if not self._dirty:
+            return
+
+        try:
+            write_json_atomic(self.path, self._players)
+        except OSError:
+            log.exception('Failed to save the watch list to %r', self.path)
+        else:
+            self._dirty = False
@@ -200,6 +200,26 @@ def crop_and_generate_image(img):
     return tee_images
 
 
+def render_skin_preview(data: bytes) -> BytesIO:
+    processed_images = crop_and_generate_image(Image.open(BytesIO(data)))
+
+    final_image = Image.new('RGBA', (512, 64))
+
+    x_offset = 0
+    y_offset = 0
+    for name, processed_img in processed_images.items():
+        final_image.paste(processed_img, (x_offset, y_offset))
+        x_offset += processed_img.size[0]
+        if x_offset >= final_image.size[0]:
+            x_offset = 0
+            y_offset += processed_img.size[1]
+
+    byte_io = BytesIO()
+    final_image.save(byte_io, 'PNG')
+    byte_io.seek(0)
+    return byte_io
+
+
 class SkinDB(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
@@ -255,35 +275,11 @@ class SkinDB(commands.Cog):
                 await asyncio.sleep(2 * 60)
                 await privacy_err_msg.delete()
         else:
-            attachments = message.attachments
-            images = []
-            for attachment in attachments:
-                img_bytes = await attachment.read()
-                img = Image.open(BytesIO(img_bytes))
-                images.append(img)
-
-            image_to_process = None
-            for img in images:
-                if img.size == (256, 128):
-                    image_to_process = img
-                    break
-
-            processed_images = crop_and_generate_image(image_to_process)
+            attachment = next((a for a in message.attachments if (a.width, a.height) == (256, 128)), None)
+            if attachment is None:
+                return
 
-            final_image = Image.new('RGBA', (512, 64))
-
-            x_offset = 0
-            y_offset = 0
-            for name, processed_img in processed_images.items():
-                final_image.paste(processed_img, (x_offset, y_offset))
-                x_offset += processed_img.size[0]
-                if x_offset >= final_image.size[0]:
-                    x_offset = 0
-                    y_offset += processed_img.size[1]
-
-            byte_io = BytesIO()
-            final_image.save(byte_io, 'PNG')
-            byte_io.seek(0)
+            byte_io = await self.bot.render_pool.run(render_skin_preview, await attachment.read())
             file = discord.File(byte_io, filename='final_image.png')
 
             image_preview_message = await message.channel.send(file=file)
@@ -1,18 +1,22 @@
+import asyncio
 import discord
 import json
-import os
 import re
-import requests
 import logging
 
+import asyncpg
+
 from discord.ext import commands, tasks
-from datetime import datetime, timedelta, timezone
+from datetime import datetime
 from typing import Union
 
 from cogs.ticketsystem.buttons import MainMenu
-from cogs.ticketsystem.close import CloseButton, process_ticket_closure
+from cogs.ticketsystem.close import CloseButton
+from cogs.ticketsystem.closure import ClosureJob, ClosureQueue
+from cogs.ticketsystem.inactivity import INACTIVITY_EXEMPT, InactivityTracker
+from cogs.ticketsystem.store import TicketStore
 from cogs.ticketsystem.subscribe import SubscribeMenu
-from utils.transcript import transcript
+from utils.servers import ServerIndex
 
 GUILD_DDNET            = 252358080522747904
 CHAN_MODERATOR         = 345588928482508801
@@ -22,56 +26,29 @@ ROLE_ADMIN             = 293495272892399616
 ROLE_DISCORD_MODERATOR = 737776812234506270
 ROLE_MODERATOR         = 252523225810993153
 
-TH_REPORTS             = 1156218166914060288
-TH_BAN_APPEALS         = 1156218327564300289
-TH_RENAMES             = 1156218426633769032
-TH_COMPLAINTS          = 1156218705701785660
-TH_ADMIN_MAIL          = 1156218815164723261
 
 log = logging.getLogger('tickets')
 
 def is_staff(member: discord.Member) -> bool:
     return any(role.id in (ROLE_ADMIN, ROLE_DISCORD_MODERATOR, ROLE_MODERATOR) for role in member.roles)
 
-def extract_servers(tags, network):
-    jsondata = requests.get("https://info.ddnet.org/info", timeout=1).json()
-
-    server_list = None
-    if network == "ddnet":
-        server_list = jsondata.get('servers')
-    elif network == "kog":
-        server_list = jsondata.get('servers-kog')
-
-    all_servers = []
-    for address in server_list:
-        server = address.get('servers')
-        for tag in tags:
-            server_lists = server.get(tag)
-            if server_lists is not None:
-                all_servers += server_lists
-    return all_servers
-
-def server_link(addr):
-    ddnet = extract_servers(['DDNet', 'Test', 'Tutorial'], "ddnet")
-    ddnetpvp = extract_servers(['Block', 'Infection', 'iCTF', 'gCTF', 'Vanilla', 'zCatch',
-                                'TeeWare', 'Foot', 'xPanic', 'Monster'], "ddnet")
-    nobyfng = extract_servers(['FNG'], "ddnet")
-    kog = extract_servers(['Gores', 'TestGores'], "kog")
-
-    ipv4_addr = re.compile(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}:\d{1,4}')
-    re_match = ipv4_addr.findall(addr)
-
-    if re_match[0] in ddnet:
+IPV4_ADDR = re.compile(r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}:\d{1,4}')
+
+async def server_link(servers: ServerIndex, addr):
+    re_match = IPV4_ADDR.findall(addr)
+    category = await servers.classify(re_match[0])
+
+    if category == 'ddnet':
         message_text = f'{re_match[0]} is an official DDNet server. ' \
                        f'\n<https://ddnet.org/connect-to/?addr={re_match[0]}/>'
-    elif re_match[0] in ddnetpvp:
+    elif category == 'ddnet-pvp':
         message_text = f'{re_match[0]} is an official DDNet PvP server. ' \
                        f'\n<https://ddnet.org/connect-to/?addr={re_match[0]}/>'
-    elif re_match[0] in kog:
+    elif category == 'kog':
         message_text = f'{re_match[0]} appears to be a KoG server. DDNet and KoG aren\'t affiliated. ' \
                        f'\nJoin their discord and ask for help there instead. <https://discord.kog.tw/>'
         return {"errfng": message_text}
-    elif re_match[0] in nobyfng:
+    elif category == 'fng':
         message_text = f'{re_match[0]} appears to be a FNG server found within the DDNet tab. ' \
                        f'\nThese servers are classified as official but are not regulated by us. ' \
                        f'\nFor support, join this https://discord.gg/utB4Rs3 discord server instead.'
@@ -86,12 +63,25 @@ def server_link(addr):
 class TicketSystem(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
-        self.ticket_data_file = "data/ticket-system/ticket_data.json"
-        self.ticket_data = {}
+        self.store = TicketStore(bot.pool)
+        self.inactivity = InactivityTracker()
+        self._inactivity_wakeup = asyncio.Event()
         self.check_inactive_tickets.start()
+        self.save_ticket_activity.start()
         self.update_scores_topic.start()
         self.mentions = set()
         self.verify_message = {}
+        self.servers = ServerIndex(bot.http_cache)
+        self.refresh_servers.start()
+        self.closures = ClosureQueue(bot, self.store)
+        self.closures.start()
+
+    async def cog_unload(self):
+        self.closures.stop()
+        self.refresh_servers.cancel()
+        self.check_inactive_tickets.cancel()
+        self.save_ticket_activity.cancel()
+        await self.store.set_activity(self.inactivity.pop_dirty())
 
     @commands.command(hidden=True)
     async def ticket_menu(self, ctx):
@@ -154,7 +144,7 @@ class TicketSystem(commands.Cog):
             colour=16776960
         )
         await ctx.message.delete()
-        await ctx.send(embeds=[embed, embed_warning], view=MainMenu(self.ticket_data))
+        await ctx.send(embeds=[embed, embed_warning], view=MainMenu(self.store))
 
     @commands.command(hidden=True)
     async def subscribe_button(self, ctx):
@@ -164,7 +154,7 @@ class TicketSystem(commands.Cog):
         await ctx.send(
             f'Choose the ticket categories you wish to receive notifications for, '
             f'or use the Subscribe/Unsubscribe buttons to manage notifications for all categories.',
-            view=SubscribeMenu(self.ticket_data)
+            view=SubscribeMenu(self.store)
         )
 
     @commands.command(hidden=True)
@@ -219,205 +209,97 @@ class TicketSystem(commands.Cog):
             await ctx.channel.send('This ticket does not belong to you.')
             return
 
-        ticket_channel = self.bot.get_channel(ctx.channel.id)
-        ticket_creator = await self.bot.fetch_user(ticket_creator_id)
-
-        transcript_file, zip_file = await transcript(self.bot, ticket_channel)
-        ticket_category = process_ticket_closure(self, ticket_channel.id, ticket_creator_id=ticket_creator_id)
+        job = ClosureJob(ctx.channel.id, ticket_creator_id, closed_by_id=ctx.author.id, closed_by=str(ctx.author),
+                         staff=is_staff(ctx.author), message=message, channel_name=ctx.channel.name)
+        if not self.closures.enqueue(job):
+            await ctx.send('This ticket is already being closed.')
 
-        if transcript_file:
-            await ticket_channel.send(f'Uploading files...')
-            targets = {
-                'report': TH_REPORTS,
-                'ban_appeal': TH_BAN_APPEALS,
-                'rename': TH_RENAMES,
-                'complaint': TH_COMPLAINTS,
-                'admin-mail': TH_ADMIN_MAIL,
-            }
-
-            if ticket_category in targets:
-                target_channel = self.bot.get_channel(targets[ticket_category])
-            else:
-                await ticket_channel.send("Something went horribly wrong. Target Channel doesn't exist or is locked.")
-                return
-
-            if target_channel:
-                t_message = (
-                    f'**Ticket Channel ID: {ticket_channel.id}**'
-                    f'\n\"{ticket_category.title()}\" Ticket created by: <@{ticket_creator.id}> '
-                    f'(Global Name: {ticket_creator}) and closed by <@{ctx.author.id}> (Global Name: {ctx.author})')
-
-                await target_channel.send(
-                    t_message,
-                    files=[discord.File(transcript_file)],
-                    allowed_mentions=discord.AllowedMentions(users=False)
-                )
-
-                if zip_file is not None:
-                    for z in zip_file:
-                        await target_channel.send(
-                            files=[discord.File(z)],
-                            allowed_mentions=discord.AllowedMentions(users=False)
-                        )
-            else:
-                await ticket_channel.send("Something went horribly wrong. Invalid ticket category.")
-
-        if is_staff(ctx.author):
-            response = f"Your ticket (category \"{ticket_category.capitalize()}\") has been closed by staff."
-            if message:
-                response += f"\nThis is the message that has been left for you by our team:\n> {message}"
-        else:
-            response = f"Your ticket (category \"{ticket_category.capitalize()}\") has been closed."
-
-        if transcript_file is not None:
-            response += "\n**Transcript:**"
-
-        try:
-            if response:
-                await ticket_creator.send(content=response,
-                                          file=discord.File(transcript_file) if transcript_file else None)
-        except discord.Forbidden:
-            pass
-
-        file_paths = []
-        if transcript_file is not None:
-            file_paths.append(transcript_file)
-        if zip_file is not None and isinstance(zip_file, list):
-            file_paths.extend(zip_file)
+    @tasks.loop()
+    async def check_inactive_tickets(self):
+        # sleeps until the next reminder or closure is due, new tickets wake it up in case theirs is the earliest
+        deadline = self.inactivity.next_deadline()
+        timeout = None if deadline is None else max((deadline - datetime.utcnow()).total_seconds(), 0)
         try:
-            for file_path in file_paths:
-                if file_path is not None:
-                    os.remove(file_path)
-        except FileNotFoundError:
+            await asyncio.wait_for(self._inactivity_wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
             pass
+        self._inactivity_wakeup.clear()
 
-        await ticket_channel.send(f'Done! Closing Ticket...')
-        await ctx.channel.delete()
-
-        log.info(
-            f"{ctx.author} (ID: {ctx.author.id}) closed a ticket made by {ticket_creator} "
-            f"(ID: {ticket_creator_id}). Removed Channel named {ctx.channel.name} (ID: {ctx.channel.id})"
-        )
-
-    @tasks.loop(hours=1)
-    async def check_inactive_tickets(self):
-        channels_to_remove = []
-        for ticket_user_id, ticket_data in self.ticket_data.get("tickets", {}).items():
-            for channel_id, ticket_category in ticket_data.get("channel_ids", []):
-                ticket_channel = self.bot.get_channel(channel_id)
-
-                if ticket_category in ['admin-mail', 'complaint']:
-                    continue
-
-                inactivity_count = ticket_data.get("inactivity_count", {})
-
-                now = datetime.utcnow().replace(tzinfo=timezone.utc)
-
-                recent_messages = []
-                async for msg in ticket_channel.history(limit=5, oldest_first=False):
-                    if not msg.author.bot:
-                        recent_messages.append(msg)
-
-                if recent_messages and recent_messages[0].created_at.astimezone(timezone.utc) > now - timedelta(
-                        days=1):
-                    inactivity_count[str(channel_id)] = 0
-                else:
-                    inactivity_count[str(channel_id)] = inactivity_count.get(str(channel_id), 0) + 1
+        for action, channel_id, ticket_user_id in self.inactivity.due(datetime.utcnow()):
+            ticket_channel = self.bot.get_channel(channel_id)
+            if ticket_channel is None or self.closures.is_closing(channel_id):
+                self.inactivity.remove(channel_id)
+                continue
 
-                if inactivity_count[str(channel_id)] == 2:
+            if action == 'remind':
+                try:
                     await ticket_channel.send(
                         f'<@{ticket_user_id}>, this ticket is about to be closed due to inactivity.'
                         f'\nIf your report or question has been resolved, consider closing '
                         f'this ticket yourself by typing $close.'
                         f'\n**To keep this ticket active, please reply to this message.**'
                     )
-                    pass
-
-                if inactivity_count[str(channel_id)] >= 6:
-                    channels_to_remove.append((ticket_channel.id, ticket_user_id))
-
-        with open(self.ticket_data_file, "w") as f:
-            json.dump(self.ticket_data, f, indent=4)
-
-        if channels_to_remove:
-            for channel_id, ticket_creator_id in channels_to_remove:
-                ticket_channel = self.bot.get_channel(channel_id)
-                transcript_file, zip_file = await transcript(self.bot, ticket_channel)
-                ticket_creator = await self.bot.fetch_user(ticket_creator_id)
-                ticket_category = process_ticket_closure(self, ticket_channel.id,
-                                                         ticket_creator_id=ticket_creator_id)
-
-                if transcript_file:
-                    await ticket_channel.send(f'Uploading files...')
-                    targets = {
-                        'report': TH_REPORTS,
-                        'ban_appeal': TH_BAN_APPEALS,
-                        'rename': TH_RENAMES,
-                        'complaint': TH_COMPLAINTS,
-                        'admin-mail': TH_ADMIN_MAIL,
-                    }
-
-                    if ticket_category in targets:
-                        target_channel = self.bot.get_channel(targets[ticket_category])
-                    else:
-                        await ticket_channel.send("Something went horribly wrong. Target Channel doesn't exist.")
-                        return
-
-                    if target_channel:
-                        t_message = (f'\"{ticket_category.title()}\"Ticket created by: <@{ticket_creator.id}> '
-                                     f'(Global Name: {ticket_creator}), closed due to inactivity.'
-                                     f'\nTicket Channel ID: {ticket_channel.id}')
-
-                        await target_channel.send(
-                            t_message,
-                            files=[discord.File(transcript_file)],
-                            allowed_mentions=discord.AllowedMentions(users=False)
-                        )
-
-                        if zip_file is not None:
-                            for z in zip_file:
-                                await target_channel.send(
-                                    files=[discord.File(z)],
-                                    allowed_mentions=discord.AllowedMentions(users=False)
-                                )
-                    else:
-                        await ticket_channel.send("Something went horribly wrong. Invalid ticket category.")
-
-                message = f"Your ticket (category \"{ticket_category.capitalize()}\") has been closed due to inactivity."
-
-                if transcript_file is not None:
-                    message += "\n**Transcript:**"
-
-                try:
-                    if message:
-                        await ticket_creator.send(content=message,
-                                                  file=discord.File(transcript_file) if transcript_file else None)
-                except discord.Forbidden:
-                    pass
-
-                file_paths = []
-                if transcript_file is not None:
-                    file_paths.append(transcript_file)
-                if zip_file is not None and isinstance(zip_file, list):
-                    file_paths.extend(zip_file)
-                try:
-                    for file_path in file_paths:
-                        if file_path is not None:
-                            os.remove(file_path)
-                except FileNotFoundError:
-                    pass
-
-                await ticket_channel.send(f'Done! Closing Ticket...')
-                await ticket_channel.delete()
-
-                log.info(
-                    f" Removed channel named {ticket_channel.name} (ID: {ticket_channel.id}), due to inactivity."
-                )
+                except discord.HTTPException:
+                    log.exception(f'Failed to send inactivity reminder to ticket channel {channel_id}')
+            else:
+                self.closures.enqueue(ClosureJob(channel_id, ticket_user_id, channel_name=ticket_channel.name))
 
     @check_inactive_tickets.before_loop
     async def before_check_inactive_tickets(self):
         await self.bot.wait_until_ready()
 
+        for ticket in await self.store.open_tickets():
+            if ticket['category'] in INACTIVITY_EXEMPT:
+                continue
+
+            channel_id = ticket['channel_id']
+            self.inactivity.add(channel_id, ticket['creator_id'], ticket['created_at'], ticket['last_activity'],
+                                ticket['reminded'])
+
+            # only look at the history of tickets that got messages while the bot was offline
+            ticket_channel = self.bot.get_channel(channel_id)
+            if ticket_channel is None or ticket_channel.last_message_id is None:
+                continue
+            if discord.utils.snowflake_time(ticket_channel.last_message_id).replace(tzinfo=None) \
+                    <= self.inactivity.last_activity(channel_id):
+                continue
+
+            async for msg in ticket_channel.history(limit=5, oldest_first=False):
+                if not msg.author.bot:
+                    self.inactivity.touch(channel_id, msg.created_at.replace(tzinfo=None))
+                    break
+
+    @tasks.loop(minutes=1)
+    async def save_ticket_activity(self):
+        rows = self.inactivity.pop_dirty()
+        if not rows:
+            return
+
+        try:
+            await self.store.set_activity(rows)
+        except (asyncpg.PostgresError, OSError):
+            log.exception('Failed to save ticket activity')
+            self.inactivity.mark_dirty(channel_id for channel_id, _, _ in rows)
+
+    @commands.Cog.listener('on_message')
+    async def track_ticket_activity(self, message: discord.Message):
+        if message.author.bot or message.channel.id not in self.inactivity:
+            return
+
+        self.inactivity.touch(message.channel.id, message.created_at.replace(tzinfo=None))
+
+    @commands.Cog.listener()
+    async def on_ticket_open(self, ticket_channel: discord.TextChannel, ticket_creator_id: int, ticket_category: str):
+        if ticket_category in INACTIVITY_EXEMPT:
+            return
+
+        self.inactivity.add(ticket_channel.id, ticket_creator_id, datetime.utcnow())
+        self._inactivity_wakeup.set()
+
+    @commands.Cog.listener()
+    async def on_ticket_close(self, ticket_channel_id: int):
+        self.inactivity.remove(ticket_channel_id)
+
     @tasks.loop(hours=1)
     async def update_scores_topic(self):
         score_file = "data/ticket-system/scores.json"
@@ -440,14 +322,19 @@ class TicketSystem(commands.Cog):
     async def before_update_scores_topic(self):
         await self.bot.wait_until_ready()
 
+    @tasks.loop(minutes=5)
+    async def refresh_servers(self):
+        # tasks.loop only retries connection errors, anything else would stop refreshing for good
+        try:
+            await self.servers.refresh()
+        except Exception:
+            log.exception('Failed to refresh the server index')
+
     @commands.Cog.listener()
     async def on_ready(self):
-        with open(self.ticket_data_file, "r") as f:
-            self.ticket_data = json.load(f)
-
-        self.bot.add_view(view=MainMenu(self.ticket_data))
-        self.bot.add_view(view=CloseButton(self.bot, self.ticket_data))
-        self.bot.add_view(view=SubscribeMenu(self.ticket_data))
+        self.bot.add_view(view=MainMenu(self.store))
+        self.bot.add_view(view=CloseButton(self.bot))
+        self.bot.add_view(view=SubscribeMenu(self.store))
 
     @commands.Cog.listener('on_message')
     async def server_link_verify(self, message: discord.Message):
@@ -461,7 +348,7 @@ class TicketSystem(commands.Cog):
             return
 
         ipv4 = ip_match.group(0)
-        result = server_link(ipv4)
+        result = await server_link(self.servers, ipv4)
 
         if message.channel:
             if "errfng" in result:
@@ -493,7 +380,7 @@ class TicketSystem(commands.Cog):
             return
 
         ipv4 = ip_match.group(0)
-        result = server_link(ipv4)
+        result = await server_link(self.servers, ipv4)
 
         if after.channel.name.startswith('report-') and after.channel not in self.mentions:
             at_mention_moderator = f'<@&{ROLE_MODERATOR}>'
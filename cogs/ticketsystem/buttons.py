@@ -1,9 +1,9 @@
 import discord
-import json
 import logging
 
 from discord.ui import Button, button, View
 from cogs.ticketsystem.close import CloseButton
+from cogs.ticketsystem.store import TicketStore
 
 CAT_TICKETS            = 1124657181363556403
 ROLE_ADMIN             = 293495272892399616
@@ -13,66 +13,47 @@ ROLE_MODERATOR         = 252523225810993153
 log = logging.getLogger('tickets')
 
 class MainMenu(discord.ui.View):
-    def __init__(self, ticket_data):
+    def __init__(self, store: TicketStore):
         super().__init__(timeout=None)
-        self.ticket_data = ticket_data
-        self.ticket_data_file = "data/ticket-system/ticket_data.json"
+        self.store = store
 
-    def process_ticket_data(self, interaction, ticket_channel, ticket_creator_id, ticket_category):
-        ticket_num = \
-            self.ticket_data.setdefault("tickets", {}).get(str(interaction.user.id), {}).get("ticket_num", 0) + 1
+    async def process_ticket_data(self, interaction, ticket_channel, ticket_creator_id, ticket_category):
+        await self.store.attach(ticket_creator_id, ticket_category, ticket_channel.id)
+        interaction.client.dispatch('ticket_open', ticket_channel, ticket_creator_id, ticket_category)
 
-        creator_data = self.ticket_data.setdefault("tickets", {}).setdefault(str(ticket_creator_id), {})
-        creator_data.setdefault('channel_ids', []).append([int(ticket_channel.id), ticket_category])
-
-        inactivity_count = creator_data.setdefault('inactivity_count', {})
-        for channel_id, _ in creator_data['channel_ids']:
-            inactivity_count.setdefault(str(channel_id), 0)
-
-        creator_data['ticket_num'] = ticket_num
-        creator_data['inactivity_count'] = inactivity_count
-
-        with open(self.ticket_data_file, "w") as f:
-            json.dump(self.ticket_data, f, indent=4)
-
-        user_ids = self.ticket_data["subscriptions"]["categories"].get(ticket_category, [])
+        user_ids = await self.store.subscribers(ticket_category)
         mention_subscribers = [f"<@{user_id}>" for user_id in user_ids]
         mention_message = " ".join(mention_subscribers) + f' {interaction.user.mention}'
 
         return mention_message
 
     async def ticket_num(self, category) -> int:
-        ticket_num = self.ticket_data["ticket_count"]["categories"][category]
-
-        if ticket_num:
-            ticket_num = int(ticket_num) + 1
-        else:
-            ticket_num = 1
-
-        ticket_num = int(ticket_num)
-        self.ticket_data["ticket_count"]["categories"][category] = int(ticket_num)
-
-        with open(self.ticket_data_file, 'w') as file:
-            json.dump(self.ticket_data, file, indent=4)
-
-        return ticket_num
+        return await self.store.next_number(category)
 
     async def check_for_open_ticket(self, interaction, ticket_category) -> bool:
-        """Limits tickets per person to one"""
-        user_id = str(interaction.user.id)
-        ticket_info = self.ticket_data["tickets"].get(user_id)
-        if ticket_info and "channel_ids" in ticket_info:
-            channel_ids = ticket_info["channel_ids"]
-            for channel_id, category in channel_ids:
-                if category == ticket_category:
-                    channel = interaction.guild.get_channel(channel_id)
-                    await interaction.response.send_message(
-                        f"You already have an open <{ticket_category}> ticket: {channel.mention}"
-                        f"\nPlease resolve or close your existing ticket before creating a new one."
-                        f"\nYou can close your ticket using the `$close` command within your existing ticket.",
-                        ephemeral=True)
-                    return True
-        return False
+        """Limits tickets per person to one, reserves the ticket if there is none yet"""
+        if await self.store.reserve(interaction.user.id, ticket_category):
+            return False
+
+        channel_id = await self.store.find(interaction.user.id, ticket_category)
+        if channel_id is None:
+            await interaction.response.send_message(
+                f"Your <{ticket_category}> ticket is being created, please wait a moment.", ephemeral=True)
+        else:
+            await interaction.response.send_message(
+                f"You already have an open <{ticket_category}> ticket: <#{channel_id}>"
+                f"\nPlease resolve or close your existing ticket before creating a new one."
+                f"\nYou can close your ticket using the `$close` command within your existing ticket.",
+                ephemeral=True)
+        return True
+
+    async def create_ticket_channel(self, interaction, ticket_category, **kwargs) -> discord.TextChannel:
+        # without releasing the reservation the user couldn't open this kind of ticket until it expires
+        try:
+            return await interaction.guild.create_text_channel(**kwargs)
+        except Exception:
+            await self.store.release(interaction.user.id, ticket_category)
+            raise
 
     @discord.ui.button(label='Report', style=discord.ButtonStyle.danger, custom_id='MainMenu:report')
     async def t_reports(self, interaction: discord.Interaction, button: Button):  # noqa
@@ -105,14 +86,15 @@ class MainMenu(discord.ui.View):
         channel_position = category.channels[-1].position + 0
         ticket_creator_id = interaction.user.id
 
-        ticket_channel = await interaction.guild.create_text_channel(
+        ticket_channel = await self.create_ticket_channel(
+            interaction, "report",
             name=ticket_name,
             category=category,
             position=channel_position,
             overwrites=overwrites,
             topic=f"Ticket author: <@{ticket_creator_id}>")
 
-        mention_message = self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "report")
+        mention_message = await self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "report")
 
         embed = discord.Embed(
             title="How to properly file a report", color=0xff0000)
@@ -157,7 +139,7 @@ class MainMenu(discord.ui.View):
         message = await ticket_channel.send(
             mention_message,
             embeds=[embed, embed2],
-            view=CloseButton(interaction.client, self.ticket_data)
+            view=CloseButton(interaction.client)
         )
 
         await interaction.followup.send(  # noqa
@@ -195,14 +177,15 @@ class MainMenu(discord.ui.View):
         channel_position = category.channels[-1].position + 0
         ticket_creator_id = interaction.user.id
 
-        ticket_channel = await interaction.guild.create_text_channel(
+        ticket_channel = await self.create_ticket_channel(
+            interaction, "rename",
             name=ticket_name,
             category=category,
             position=channel_position,
             overwrites=overwrites,
             topic=f"Ticket author: <@{ticket_creator_id}>")
 
-        mention_message = self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "rename")
+        mention_message = await self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "rename")
 
         embed = discord.Embed(title="Player Rename", colour=2210995)
         embed.add_field(
@@ -233,7 +216,7 @@ class MainMenu(discord.ui.View):
             inline=False
         )
 
-        close = CloseButton(interaction.client, self.ticket_data)
+        close = CloseButton(interaction.client)
         close.remove_item(close.t_moderator_check)
 
         message = await ticket_channel.send(
@@ -280,7 +263,8 @@ class MainMenu(discord.ui.View):
         channel_position = category.channels[-1].position + 0
         ticket_creator_id = interaction.user.id
 
-        ticket_channel = await interaction.guild.create_text_channel(
+        ticket_channel = await self.create_ticket_channel(
+            interaction, "ban_appeal",
             name=ticket_name,
             category=category,
             position=channel_position,
@@ -288,7 +272,7 @@ class MainMenu(discord.ui.View):
             topic=f"Ticket author: <@{ticket_creator_id}>"
         )
 
-        mention_message = self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "ban_appeal")
+        mention_message = await self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "ban_appeal")
 
         embed = discord.Embed(title="Ban appeal", colour=2210995)
         embed.add_field(
@@ -320,7 +304,7 @@ class MainMenu(discord.ui.View):
             inline=False
         )
 
-        close = CloseButton(interaction.client, self.ticket_data)
+        close = CloseButton(interaction.client)
         close.remove_item(close.t_moderator_check)
 
         message = await ticket_channel.send(
@@ -364,7 +348,8 @@ class MainMenu(discord.ui.View):
         channel_position = category.channels[-1].position + 0
         ticket_creator_id = interaction.user.id
 
-        ticket_channel = await interaction.guild.create_text_channel(
+        ticket_channel = await self.create_ticket_channel(
+            interaction, "complaint",
             name=ticket_name,
             category=category,
             position=channel_position,
@@ -372,7 +357,7 @@ class MainMenu(discord.ui.View):
             topic=f"Ticket author: <@{ticket_creator_id}>"
         )
 
-        mention_message = self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "complaint")
+        mention_message = await self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "complaint")
 
         embed = discord.Embed(title="Complaint", colour=2210995)
         embed.add_field(
@@ -399,7 +384,7 @@ class MainMenu(discord.ui.View):
             inline=False
         )
 
-        close = CloseButton(interaction.client, self.ticket_data)
+        close = CloseButton(interaction.client)
         close.remove_item(close.t_moderator_check)
 
         message = await ticket_channel.send(
@@ -443,7 +428,8 @@ class MainMenu(discord.ui.View):
         channel_position = category.channels[-1].position + 0
         ticket_creator_id = interaction.user.id
 
-        ticket_channel = await interaction.guild.create_text_channel(
+        ticket_channel = await self.create_ticket_channel(
+            interaction, "admin-mail",
             name=ticket_name,
             category=category,
             position=channel_position,
@@ -451,7 +437,7 @@ class MainMenu(discord.ui.View):
             topic=f"Ticket author: <@{ticket_creator_id}>"
         )
 
-        mention_message = self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "admin-mail")
+        mention_message = await self.process_ticket_data(interaction, ticket_channel, ticket_creator_id, "admin-mail")
 
         embed = discord.Embed(title="Admin-Mail", colour=2210995)
         embed.add_field(
@@ -474,7 +460,7 @@ class MainMenu(discord.ui.View):
             inline=False
         )
 
-        close = CloseButton(interaction.client, self.ticket_data)
+        close = CloseButton(interaction.client)
         close.remove_item(close.t_moderator_check)
 
         message = await ticket_channel.send(
@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+import os
+
+import aiohttp
+import asyncpg
+import discord
+
+from cogs.ticketsystem.store import TicketStore
+from utils.misc import write_json_atomic
+from utils.transcript import transcript
+
+TH_REPORTS             = 1156218166914060288
+TH_BAN_APPEALS         = 1156218327564300289
+TH_RENAMES             = 1156218426633769032
+TH_COMPLAINTS          = 1156218705701785660
+TH_ADMIN_MAIL          = 1156218815164723261
+
+TARGETS = {
+    'report': TH_REPORTS,
+    'ban_appeal': TH_BAN_APPEALS,
+    'rename': TH_RENAMES,
+    'complaint': TH_COMPLAINTS,
+    'admin-mail': TH_ADMIN_MAIL,
+}
+
+# the ticket row is only removed once everything that can fail before the channel is deleted went through
+STEPS = ('check', 'transcript', 'upload', 'notify', 'record', 'cleanup', 'delete')
+ATTEMPTS = 3
+# attachment downloads are retried on their own, repeating the step would download everything again
+SINGLE_ATTEMPT = ('transcript',)
+WORKERS = 3
+
+log = logging.getLogger('tickets')
+
+
+class ClosureAborted(Exception):
+    """Raised by a step to stop the closure and leave the ticket open, the message is posted in the ticket."""
+
+
+class ClosureJob:
+    """A ticket that is being closed. `closed_by_id` is None for tickets closed due to inactivity.
+
+    Everything a step produces is stored on the job so that it can be persisted and resumed after a restart, `sent`
+    holds the messages that were already posted.
+    """
+
+    def __init__(self, channel_id, creator_id, closed_by_id=None, closed_by=None, staff=False, message=None,
+                 channel_name=None, done=None, transcript_file=None, zip_files=None, category=None, uploaded=0,
+                 creator_name=None, sent=None):
+        self.channel_id = channel_id
+        self.creator_id = creator_id
+        self.closed_by_id = closed_by_id
+        self.closed_by = closed_by
+        self.staff = staff
+        self.message = message
+        self.channel_name = channel_name
+        self.done = done or []
+        self.transcript_file = transcript_file
+        self.zip_files = zip_files
+        self.category = category
+        self.uploaded = uploaded
+        self.creator_name = creator_name
+        self.sent = sent or []
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class ClosureQueue:
+    """Runs ticket closures in the background, up to WORKERS at a time.
+
+    Pending jobs and the steps they completed are persisted to `path`, so a restart resumes them without repeating
+    finished steps. Failed steps are retried ATTEMPTS times before the job is given up on and the ticket is left open.
+    """
+
+    def __init__(self, bot, store: TicketStore, path='data/ticket-system/closure_queue.json'):
+        self.bot = bot
+        self.store = store
+        self.path = path
+        self.jobs = {}
+        self._queue = asyncio.Queue()
+        self._workers = []
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                jobs = json.load(f)
+        except FileNotFoundError:
+            return
+
+        for data in jobs:
+            job = ClosureJob(**data)
+            self.jobs[job.channel_id] = job
+            self._queue.put_nowait(job)
+
+        if jobs:
+            log.info(f'Resuming {len(jobs)} ticket closure(s)')
+
+    def save(self):
+        write_json_atomic(self.path, [job.to_dict() for job in self.jobs.values()])
+
+    def start(self):
+        if self._workers:
+            return
+
+        self.load()
+        self._workers = [asyncio.ensure_future(self._worker()) for _ in range(WORKERS)]
+
+    def stop(self):
+        for worker in self._workers:
+            worker.cancel()
+        self._workers.clear()
+
+    def is_closing(self, channel_id) -> bool:
+        return channel_id in self.jobs
+
+    def enqueue(self, job: ClosureJob) -> bool:
+        if job.channel_id in self.jobs:
+            return False
+
+        self.jobs[job.channel_id] = job
+        self.save()
+        self._queue.put_nowait(job)
+        return True
+
+    async def _worker(self):
+        await self.bot.wait_until_ready()
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception:
+                log.exception(f'Closing ticket channel {job.channel_id} failed')
+                self._finish(job)
+            finally:
+                self._queue.task_done()
+
+    def _finish(self, job: ClosureJob):
+        self.jobs.pop(job.channel_id, None)
+        self.save()
+
+    async def _run(self, job: ClosureJob):
+        for step in STEPS:
+            if step in job.done:
+                continue
+
+            func = getattr(self, f'_{step}')
+            attempts = 1 if step in SINGLE_ATTEMPT else ATTEMPTS
+            for attempt in range(attempts):
+                try:
+                    await func(job)
+                    break
+                except ClosureAborted as exc:
+                    log.warning(f'Ticket closure for channel {job.channel_id} aborted: {exc}')
+                    await self._abandon(job, f'{exc} The ticket was left open.')
+                    return
+                except (discord.Forbidden, discord.NotFound):
+                    log.exception(f'Ticket closure step {step!r} for channel {job.channel_id} failed')
+                    await self._abandon(job, 'Closing this ticket failed, it was left open.')
+                    return
+                except (discord.HTTPException, aiohttp.ClientError, asyncio.TimeoutError, OSError,
+                        asyncpg.PostgresError):
+                    if attempt == attempts - 1:
+                        log.exception(f'Ticket closure step {step!r} for channel {job.channel_id} failed, giving up')
+                        await self._abandon(job, 'Closing this ticket failed, it was left open. Try again later.')
+                        return
+
+                    await asyncio.sleep(5 * 2 ** attempt)
+
+            job.done.append(step)
+            self.save()
+
+        self._finish(job)
+
+    async def _abandon(self, job: ClosureJob, notice: str):
+        """Leaves the ticket open after an aborted or failed closure, so that it can be closed again."""
+        try:
+            await self._cleanup(job)
+
+            ticket_channel = self.bot.get_channel(job.channel_id)
+            if ticket_channel is not None and job.category in TARGETS:
+                # the ticket might already be gone from the database and the inactivity tracker
+                if 'record' in job.done:
+                    await self.store.add(job.channel_id, job.creator_id, job.category)
+                self.bot.dispatch('ticket_open', ticket_channel, job.creator_id, job.category)
+
+            if ticket_channel is not None:
+                await ticket_channel.send(notice)
+        except (discord.HTTPException, asyncpg.PostgresError, OSError):
+            log.exception(f'Failed to leave ticket channel {job.channel_id} open')
+        finally:
+            self._finish(job)
+
+    async def _send_once(self, job: ClosureJob, key: str, messageable, content=None, **kwargs):
+        # a retried or resumed step must not post the same message again
+        if key in job.sent:
+            return
+
+        try:
+            await messageable.send(content, **kwargs)
+        except discord.Forbidden:
+            if not isinstance(messageable, discord.User):
+                raise
+
+        job.sent.append(key)
+        self.save()
+
+    async def _check(self, job: ClosureJob):
+        job.category = await self.store.category(job.channel_id)
+        if job.category not in TARGETS:
+            raise ClosureAborted("Something went horribly wrong. Target Channel doesn't exist.")
+
+    async def _transcript(self, job: ClosureJob):
+        ticket_channel = self.bot.get_channel(job.channel_id)
+        if ticket_channel is None:
+            return
+
+        await self._send_once(job, 'collecting', ticket_channel, 'Collecting messages...')
+        job.transcript_file, job.zip_files = await transcript(self.bot, ticket_channel)
+        self.save()
+
+        if job.transcript_file is None:
+            await self._send_once(job, 'no_messages', ticket_channel, 'No messages found...')
+
+    async def _record(self, job: ClosureJob):
+        if await self.store.remove(job.channel_id) is None:
+            log.info(f'Ticket data for {job.channel_id} does not exist')
+        self.bot.dispatch('ticket_close', job.channel_id)
+
+    async def _upload(self, job: ClosureJob):
+        # the temp files are gone if the bot restarted on another machine or someone cleaned them up
+        if not job.transcript_file or not os.path.exists(job.transcript_file):
+            return
+
+        ticket_channel = self.bot.get_channel(job.channel_id)
+        ticket_creator = await self.bot.fetch_user(job.creator_id)
+
+        if ticket_channel is not None:
+            await self._send_once(job, 'uploading', ticket_channel, 'Uploading files...')
+
+        target_channel = self.bot.get_channel(TARGETS[job.category])
+        if not target_channel:
+            if ticket_channel is not None:
+                await self._send_once(job, 'no_target', ticket_channel,
+                                      "Something went horribly wrong. Invalid ticket category.")
+            return
+
+        if job.closed_by_id is None:
+            t_message = (f'\"{job.category.title()}\"Ticket created by: <@{ticket_creator.id}> '
+                         f'(Global Name: {ticket_creator}), closed due to inactivity.'
+                         f'\nTicket Channel ID: {job.channel_id}')
+        else:
+            t_message = (
+                f'**Ticket Channel ID: {job.channel_id}**'
+                f'\n\"{job.category.title()}\" Ticket created by: <@{ticket_creator.id}> '
+                f'(Global Name: {ticket_creator}) and closed by <@{job.closed_by_id}> (Global Name: {job.closed_by})')
+
+        # every sent message is recorded so that a retry doesn't post it again
+        files = [job.transcript_file] + [z for z in job.zip_files or [] if os.path.exists(z)]
+        for i, file in enumerate(files[job.uploaded:], start=job.uploaded):
+            await target_channel.send(
+                t_message if i == 0 else None,
+                files=[discord.File(file)],
+                allowed_mentions=discord.AllowedMentions(users=False)
+            )
+            job.uploaded = i + 1
+            self.save()
+
+    async def _notify(self, job: ClosureJob):
+        ticket_creator = await self.bot.fetch_user(job.creator_id)
+        job.creator_name = str(ticket_creator)
+        category = (job.category or '').capitalize()
+
+        if job.closed_by_id is None:
+            response = f"Your ticket (category \"{category}\") has been closed due to inactivity."
+        elif job.staff:
+            response = f"Your ticket (category \"{category}\") has been closed by staff."
+            if job.message:
+                response += f"\nThis is the message that has been left for you by our team:\n> {job.message}"
+        else:
+            response = f"Your ticket (category \"{category}\") has been closed."
+
+        transcript_file = job.transcript_file if job.transcript_file and os.path.exists(job.transcript_file) else None
+        if transcript_file is not None:
+            response += "\n**Transcript:**"
+
+        # users that don't accept DMs raise Forbidden, that counts as sent
+        await self._send_once(job, 'notify', ticket_creator, response,
+                              file=discord.File(transcript_file) if transcript_file else None)
+
+    async def _cleanup(self, job: ClosureJob):
+        for file_path in [job.transcript_file] + (job.zip_files or []):
+            if file_path is not None:
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    pass
+
+    async def _delete(self, job: ClosureJob):
+        ticket_channel = self.bot.get_channel(job.channel_id)
+        if ticket_channel is not None:
+            await self._send_once(job, 'done', ticket_channel, 'Done! Closing Ticket...')
+            try:
+                await ticket_channel.delete()
+            except discord.NotFound:
+                pass
+
+        if job.closed_by_id is None:
+            log.info(f" Removed channel named {job.channel_name} (ID: {job.channel_id}), due to inactivity.")
+        else:
+            log.info(
+                f"{job.closed_by} (ID: {job.closed_by_id}) closed a ticket made by {job.creator_name} "
+                f"(ID: {job.creator_id}). Removed Channel named {job.channel_name} (ID: {job.channel_id})"
+            )
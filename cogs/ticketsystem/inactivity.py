@@ -0,0 +1,101 @@
+import heapq
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+INACTIVE_AFTER = timedelta(days=1)
+REMIND_AFTER = INACTIVE_AFTER + timedelta(hours=2)
+CLOSE_AFTER = INACTIVE_AFTER + timedelta(hours=6)
+# tickets nobody wrote in yet don't get the grace day, they count from their creation
+EMPTY_REMIND_AFTER = timedelta(hours=2)
+EMPTY_CLOSE_AFTER = timedelta(hours=6)
+
+INACTIVITY_EXEMPT = ('admin-mail', 'complaint')
+
+
+class InactivityTracker:
+    """Keeps the last human activity of every open ticket and a min-heap of the next reminder or closure deadline.
+
+    Deadlines count from the last human message, or from the creation of tickets that didn't get one yet.
+
+    New activity only ever moves a deadline back, so messages don't touch the heap. There is one entry per ticket and
+    `due` reschedules entries whose ticket saw activity since they were pushed.
+    """
+
+    def __init__(self):
+        self._tickets: Dict[int, list] = {}  # channel_id -> [creator_id, last activity, reminded, had a message]
+        self._heap: List[Tuple[datetime, int]] = []
+        self._dirty: Set[int] = set()
+
+    def __contains__(self, channel_id: int) -> bool:
+        return channel_id in self._tickets
+
+    def _deadline(self, channel_id: int) -> datetime:
+        _, last_activity, reminded, active = self._tickets[channel_id]
+        if active:
+            return last_activity + (CLOSE_AFTER if reminded else REMIND_AFTER)
+        return last_activity + (EMPTY_CLOSE_AFTER if reminded else EMPTY_REMIND_AFTER)
+
+    def _push(self, channel_id: int):
+        heapq.heappush(self._heap, (self._deadline(channel_id), channel_id))
+
+    def add(self, channel_id: int, creator_id: int, created_at: datetime, last_activity: Optional[datetime] = None,
+            reminded: bool = False):
+        self._tickets[channel_id] = [creator_id, last_activity or created_at, reminded, last_activity is not None]
+        self._push(channel_id)
+
+    def remove(self, channel_id: int):
+        self._tickets.pop(channel_id, None)
+        self._dirty.discard(channel_id)
+
+    def last_activity(self, channel_id: int) -> Optional[datetime]:
+        ticket = self._tickets.get(channel_id)
+        return ticket[1] if ticket else None
+
+    def touch(self, channel_id: int, when: datetime):
+        ticket = self._tickets.get(channel_id)
+        if ticket is None or when <= ticket[1]:
+            return
+
+        ticket[1] = when
+        ticket[2] = False
+        ticket[3] = True
+        self._dirty.add(channel_id)
+
+    def next_deadline(self) -> Optional[datetime]:
+        return self._heap[0][0] if self._heap else None
+
+    def due(self, now: datetime) -> List[Tuple[str, int, int]]:
+        """Returns ('remind' or 'close', channel_id, creator_id) for every deadline that passed.
+
+        Reminded tickets get their closure deadline scheduled, tickets due for closure stop being tracked.
+        """
+        actions = []
+        while self._heap and self._heap[0][0] <= now:
+            deadline, channel_id = heapq.heappop(self._heap)
+            if channel_id not in self._tickets:
+                continue
+
+            if self._deadline(channel_id) != deadline:
+                self._push(channel_id)
+                continue
+
+            ticket = self._tickets[channel_id]
+            if ticket[2]:
+                actions.append(('close', channel_id, ticket[0]))
+                self.remove(channel_id)
+            else:
+                actions.append(('remind', channel_id, ticket[0]))
+                ticket[2] = True
+                self._dirty.add(channel_id)
+                self._push(channel_id)
+
+        return actions
+
+    def mark_dirty(self, channel_ids: Iterable[int]):
+        self._dirty.update(c for c in channel_ids if c in self._tickets)
+
+    def pop_dirty(self) -> List[Tuple[int, Optional[datetime], bool]]:
+        """Returns (channel_id, last activity or None, reminded) of the tickets that changed since the last call."""
+        rows = [(c, self._tickets[c][1] if self._tickets[c][3] else None, self._tickets[c][2]) for c in self._dirty]
+        self._dirty.clear()
+        return rows
@@ -0,0 +1,92 @@
+from typing import List, Optional
+
+import asyncpg
+
+CATEGORIES = ('report', 'rename', 'ban_appeal', 'complaint', 'admin-mail')
+
+
+class TicketStore:
+    """Open tickets, per category ticket numbers and subscriptions, stored in PostgreSQL.
+
+    Every method only touches the rows it changes, concurrent interactions don't overwrite each other.
+    """
+
+    def __init__(self, pool: asyncpg.pool.Pool):
+        self.pool = pool
+
+    async def open_tickets(self) -> List[asyncpg.Record]:
+        query = """SELECT channel_id, creator_id, category, created_at, last_activity, reminded FROM tickets
+                   WHERE channel_id IS NOT NULL;
+                """
+        return await self.pool.fetch(query)
+
+    async def find(self, creator_id: int, category: str) -> Optional[int]:
+        query = 'SELECT channel_id FROM tickets WHERE creator_id = $1 AND category = $2 LIMIT 1;'
+        return await self.pool.fetchval(query, creator_id, category)
+
+    async def category(self, channel_id: int) -> Optional[str]:
+        query = 'SELECT category FROM tickets WHERE channel_id = $1;'
+        return await self.pool.fetchval(query, channel_id)
+
+    async def next_number(self, category: str) -> int:
+        query = """INSERT INTO tickets_count (category, count) VALUES ($1, 1)
+                   ON CONFLICT (category) DO UPDATE SET count = tickets_count.count + 1
+                   RETURNING count;
+                """
+        return await self.pool.fetchval(query, category)
+
+    async def reserve(self, creator_id: int, category: str) -> bool:
+        """Claims the ticket of `creator_id` in `category` before its channel exists, False if there already is one.
+
+        A reservation that never got a channel, e.g. because the bot restarted in between, expires after 10 minutes.
+        """
+        query = """INSERT INTO tickets (creator_id, category) VALUES ($1, $2)
+                   ON CONFLICT (creator_id, category) DO UPDATE SET created_at = EXCLUDED.created_at
+                   WHERE tickets.channel_id IS NULL
+                   AND tickets.created_at < (NOW() AT TIME ZONE 'UTC') - INTERVAL '10 minutes'
+                   RETURNING TRUE;
+                """
+        return await self.pool.fetchval(query, creator_id, category) is not None
+
+    async def attach(self, creator_id: int, category: str, channel_id: int):
+        query = """UPDATE tickets SET channel_id = $3, created_at = DEFAULT, last_activity = NULL
+                   WHERE creator_id = $1 AND category = $2 AND channel_id IS NULL;
+                """
+        await self.pool.execute(query, creator_id, category, channel_id)
+
+    async def release(self, creator_id: int, category: str):
+        query = 'DELETE FROM tickets WHERE creator_id = $1 AND category = $2 AND channel_id IS NULL;'
+        await self.pool.execute(query, creator_id, category)
+
+    async def add(self, channel_id: int, creator_id: int, category: str):
+        query = 'INSERT INTO tickets (channel_id, creator_id, category) VALUES ($1, $2, $3) ON CONFLICT DO NOTHING;'
+        await self.pool.execute(query, channel_id, creator_id, category)
+
+    async def remove(self, channel_id: int) -> Optional[str]:
+        """Returns the category of the removed ticket, None if there was none."""
+        query = 'DELETE FROM tickets WHERE channel_id = $1 RETURNING category;'
+        return await self.pool.fetchval(query, channel_id)
+
+    async def set_activity(self, rows: List[tuple]):
+        """Takes (channel_id, last_activity, reminded) rows, last_activity is None if no human wrote in the ticket."""
+        query = 'UPDATE tickets SET last_activity = $2, reminded = $3 WHERE channel_id = $1;'
+        await self.pool.executemany(query, rows)
+
+    async def subscribers(self, category: str) -> List[int]:
+        query = 'SELECT user_id FROM tickets_subscriptions WHERE category = $1 ORDER BY subscribed_at;'
+        return [r['user_id'] for r in await self.pool.fetch(query, category)]
+
+    async def subscriptions(self, user_id: int) -> List[str]:
+        query = 'SELECT category FROM tickets_subscriptions WHERE user_id = $1;'
+        return [r['category'] for r in await self.pool.fetch(query, user_id)]
+
+    async def set_subscriptions(self, user_id: int, categories: List[str]):
+        async with self.pool.acquire() as con:
+            async with con.transaction():
+                query = 'DELETE FROM tickets_subscriptions WHERE user_id = $1 AND category <> ALL($2::text[]);'
+                await con.execute(query, user_id, categories)
+
+                query = """INSERT INTO tickets_subscriptions (category, user_id) VALUES ($1, $2)
+                           ON CONFLICT DO NOTHING;
+                        """
+                await con.executemany(query, [(c, user_id) for c in categories])
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Compares the graph data preparation in utils/plot.py with the pure Python loops it replaced
+in cogs/profile.py. Run from the repository root: python3 data/tools/benchmark_plot.py
+"""
+
+import os
+import random
+import sys
+import timeit
+from datetime import date, timedelta
+
+import numpy as np
+
+sys.path.insert(0, os.getcwd())
+
+from utils.plot import finishes_per_hour, hours_line, layout_labels, points_line  # noqa: E402
+
+WIDTH = 1600
+HEIGHT = 604
+EXTRA = 2
+
+
+def points_line_loop(dates, points, start, end, x_mult, y_mult, bottom, width):
+    x = 0
+    y = bottom
+    xy = [(x, y)]
+
+    prev_date = start
+    prev_points = 0
+    for date_, points_ in zip(dates, points):
+        delta = (date_ - prev_date).days * x_mult
+        x += delta
+        if delta / width > 0.1:
+            xy.append((x, y))
+
+        y -= (points_ - prev_points) * y_mult
+        xy.append((x, y))
+
+        prev_date = date_
+        prev_points = points_
+
+    if prev_date != end:
+        xy.append((width, y))
+
+    return xy
+
+
+def hours_line_loop(hours, hour_width, height, offset):
+    hours = [
+        next((f for h, f in hours if h == i), 0)
+        for i in range(24)
+    ]
+
+    mult = lambda f: height * (1 - f / max(hours)) + offset
+
+    x = -hour_width
+    xy = [(x, mult(hours[-1]))]
+    for finishes in hours:
+        x += hour_width * 2
+        xy.append((x, mult(finishes)))
+
+    xy.append((x + hour_width * 2, mult(hours[0])))
+    return xy
+
+
+def labels_loop(labels, offset):
+    for _ in range(len(labels)):
+        labels.sort()
+        for i, (y1, _) in enumerate(labels):
+            if i == len(labels) - 1:
+                break
+
+            y2 = labels[i + 1][0]
+            if y1 - offset >= y2 + offset and y2 - offset >= y1 + offset:
+                labels[i] = ((y1 + y2) / 2, 'white')
+                del labels[i + 1]
+
+    return labels
+
+
+def main():
+    random.seed(0)
+
+    end = date.today()
+    dates = []
+    points = []
+    day = date(2013, 7, 1)
+    total = 0
+    while True:
+        day += timedelta(days=random.randint(1, 3))
+        if day >= end:
+            break
+
+        total += random.randint(1, 60)
+        dates.append(day)
+        points.append(total)
+
+    start = dates[0]
+    x_mult = WIDTH / (end - start).days
+    y_mult = HEIGHT / total
+
+    hours = [(h, random.randint(0, 5000)) for h in range(24)]
+    random.shuffle(hours)
+
+    def points_loop():
+        return points_line_loop(dates, points, start, end, x_mult, y_mult, HEIGHT + EXTRA * 2, WIDTH)
+
+    def points_numpy():
+        return points_line(dates, points, start=start, end=end, x_mult=x_mult, y_mult=y_mult,
+                           bottom=HEIGHT + EXTRA * 2, width=WIDTH).ravel().tolist()
+
+    def hours_loop():
+        return hours_line_loop(hours, WIDTH / 48, HEIGHT, EXTRA)
+
+    def hours_numpy():
+        return hours_line(finishes_per_hour(hours), hour_width=WIDTH / 48, height=HEIGHT, offset=EXTRA).ravel().tolist()
+
+    assert np.allclose(np.array(points_loop()).ravel(), points_numpy())
+    assert np.allclose(np.array(hours_loop()).ravel(), hours_numpy())
+
+    benchmarks = (
+        (f'points ({len(dates)} days)', points_loop, points_numpy),
+        ('hours (24 hours)', hours_loop, hours_numpy),
+    )
+
+    for name, loop, vectorized in benchmarks:
+        number = 200
+        loop_time = min(timeit.repeat(loop, number=number, repeat=5)) / number
+        numpy_time = min(timeit.repeat(vectorized, number=number, repeat=5)) / number
+        print(f'{name}: loop {loop_time * 1e6:.1f}µs, numpy {numpy_time * 1e6:.1f}µs '
+              f'({loop_time / numpy_time:.1f}x)')
+
+    for count in (10, 100, 1000):
+        positions = [random.uniform(0, HEIGHT) for _ in range(count)]
+        height = HEIGHT / count
+
+        ys = sorted(layout_labels(positions, height, lower=0, upper=HEIGHT))
+        assert all(b - a >= height - 1e-9 for a, b in zip(ys, ys[1:]))
+
+        number = max(1, 1000 // count)
+        old_time = min(timeit.repeat(lambda: labels_loop([(y, 'white') for y in positions], -height / 2),
+                                     number=number, repeat=3)) / number
+        new_time = min(timeit.repeat(lambda: layout_labels(positions, height, lower=0, upper=HEIGHT),
+                                     number=number, repeat=3)) / number
+        print(f'labels ({count}): old {old_time * 1e6:.1f}µs, new {new_time * 1e6:.1f}µs')
+
+
+if __name__ == '__main__':
+    main()
@@ -5,12 +5,43 @@ import asyncio
 import json
 import os
 from collections import defaultdict
-from datetime import datetime
+from datetime import date, datetime
+from typing import Dict, List, Tuple
 
 import asyncpg
 
 TIMESTAMP = datetime.utcnow().strftime('%Y-%m-%d %H:%M')
 
+# width of the $points graph in pixels, more points per player than that can't be drawn anyway
+SERIES_RESOLUTION = 800
+
+
+def points_series(finishes: Dict[str, int]) -> Tuple[List[date], List[int]]:
+    finishes = sorted((datetime.strptime(t, '%Y-%m-%d').date(), p) for t, p in finishes.items())
+
+    first = finishes[0][0]
+    span = max((finishes[-1][0] - first).days, 1)
+
+    timestamps = []
+    points = []
+    total = 0
+    prev_bucket = None
+    for timestamp, points_ in finishes:
+        total += points_
+
+        # only keep the last finish day of each pixel, but always keep the very first one
+        bucket = (timestamp - first).days * SERIES_RESOLUTION // span
+        if bucket == prev_bucket and len(timestamps) > 1:
+            timestamps[-1] = timestamp
+            points[-1] = total
+        else:
+            timestamps.append(timestamp)
+            points.append(total)
+
+        prev_bucket = bucket
+
+    return timestamps, points
+
 async def main():
     with open('players-file.json', 'r') as f:
         data = json.loads(f.read())
@@ -36,6 +67,11 @@ async def main():
         for timestamp, points in dates.items() if len(player) <= 15
     ]
 
+    tables['stats_points'] = [
+        (player, *points_series(dates))
+        for player, dates in data['finishes'].items() if len(player) <= 15 and dates
+    ]
+
     for map_, details in data['maps'].items():
         ranks = sorted([tuple(r) for r in details.pop(3)], key=lambda r: (r[1], r[0]))[:10]
         tables['stats_maps'].append((map_, *details, ranks))
@@ -49,6 +85,11 @@ async def main():
             msg = await con.copy_records_to_table(table, records=records)
             status.append(f'{table}: {msg}')
 
+        query = """INSERT INTO stats_updates (source, timestamp) VALUES ('players', NOW())
+                   ON CONFLICT (source) DO UPDATE SET timestamp = EXCLUDED.timestamp;
+                """
+        await con.execute(query)
+
     await con.close()
 
     os.remove('players-file.json')
@@ -20,4 +20,4 @@ sed -i "s/\`record_race\`/record_race/g" record_race.psql
 
 psql < record_race.psql
 
-psql -c 'BEGIN; TRUNCATE stats_hours, stats_times, stats_birthdays RESTART IDENTITY; INSERT INTO stats_hours (name, hour, finishes) SELECT name, EXTRACT(HOUR FROM timestamp) AS hour, COUNT(*) FROM record_race GROUP BY name, hour; INSERT INTO stats_times (name, time) SELECT name, SUM(time) FROM record_race GROUP BY name; INSERT INTO stats_birthdays (name, day, month) SELECT DISTINCT ON (name) name, EXTRACT(DAY FROM timestamp), EXTRACT(MONTH FROM timestamp) FROM record_race ORDER BY name, timestamp ASC; COMMIT;'
+psql -c 'BEGIN; TRUNCATE stats_hours, stats_times, stats_birthdays RESTART IDENTITY; INSERT INTO stats_hours (name, hour, finishes) SELECT name, EXTRACT(HOUR FROM timestamp) AS hour, COUNT(*) FROM record_race GROUP BY name, hour; INSERT INTO stats_times (name, time) SELECT name, SUM(time) FROM record_race GROUP BY name; INSERT INTO stats_birthdays (name, day, month) SELECT DISTINCT ON (name) name, EXTRACT(DAY FROM timestamp), EXTRACT(MONTH FROM timestamp) FROM record_race ORDER BY name, timestamp ASC; INSERT INTO stats_updates (source, timestamp) VALUES ('"'"'race'"'"', NOW()) ON CONFLICT (source) DO UPDATE SET timestamp = EXCLUDED.timestamp; COMMIT;'
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+# Moves data/ticket-system/ticket_data.json into the tickets tables. Run once while the bot is stopped.
+
+import asyncio
+import json
+import sys
+from datetime import datetime
+
+import asyncpg
+
+# cogs/ticketsystem/store.py
+CATEGORIES = ('report', 'rename', 'ban_appeal', 'complaint', 'admin-mail')
+
+
+async def main(path: str):
+    with open(path, 'r') as f:
+        data = json.load(f)
+
+    # inactivity starts counting from the time of the conversion, with the grace period of tickets that had messages
+    now = datetime.utcnow()
+    tickets = []
+    seen = set()
+    for creator_id, details in data.get('tickets', {}).items():
+        for channel_id, category in details.get('channel_ids', []):
+            # closures that failed halfway left entries without a category, only one ticket per category is allowed
+            if category not in CATEGORIES:
+                print(f'Skipping channel {channel_id} of {creator_id}: unknown category {category!r}')
+            elif (creator_id, category) in seen:
+                print(f'Skipping channel {channel_id} of {creator_id}: another {category!r} ticket is open')
+            else:
+                seen.add((creator_id, category))
+                tickets.append((int(channel_id), int(creator_id), category, now))
+
+    counts = [(c, int(n or 0)) for c, n in data['ticket_count']['categories'].items()]
+
+    subscriptions = [
+        (category, int(user_id))
+        for category, user_ids in data['subscriptions']['categories'].items()
+        for user_id in dict.fromkeys(user_ids)
+    ]
+
+    con = await asyncpg.connect()
+    async with con.transaction():
+        await con.execute('TRUNCATE tickets, tickets_count, tickets_subscriptions;')
+        await con.copy_records_to_table('tickets', records=tickets,
+                                        columns=('channel_id', 'creator_id', 'category', 'last_activity'))
+        await con.copy_records_to_table('tickets_count', records=counts)
+        await con.copy_records_to_table('tickets_subscriptions', records=subscriptions,
+                                        columns=('category', 'user_id'))
+
+    await con.close()
+
+    print(f'Converted {len(tickets)} tickets, {len(counts)} counters and {len(subscriptions)} subscriptions')
+
+
+if __name__ == '__main__':
+    asyncio.run(main(sys.argv[1] if len(sys.argv) > 1 else 'data/ticket-system/ticket_data.json'))
@@ -10,9 +10,7 @@ import asyncpg
 import uvloop
 
 from bot import DDNet
-
-uvloop.install()
-loop = asyncio.get_event_loop()
+from utils.metrics import http_trace_config
 
 
 def setup_logger(name, level, filename, propagate):
@@ -26,15 +24,6 @@ def setup_logger(name, level, filename, propagate):
     logger.addHandler(handler)
     return logger
 
-logging.getLogger('discord').setLevel(logging.INFO)
-logging.getLogger('discord.http').setLevel(logging.WARNING)
-
-# root logger
-setup_logger(None, logging.INFO, 'logs/bot.log', propagate=True)
-
-# tickets logger
-setup_logger('tickets', logging.INFO, 'logs/tickets.log', propagate=False)
-
 async def main():
     config = ConfigParser()
     config.read('config.ini')
@@ -45,10 +34,23 @@ async def main():
     except (ConnectionRefusedError, asyncpg.CannotConnectNowError):
         return logging.exception('Failed to connect to PostgreSQL, exiting')
 
-    session = aiohttp.ClientSession(loop=loop)
+    session = aiohttp.ClientSession(loop=loop, trace_configs=[http_trace_config()])
 
     bot = DDNet(config=config, pool=pool, session=session)
     await bot.start(config.get('AUTH', 'DISCORD'))
 
+# render workers are spawned and import this module again, only set up the loop and logging in the bot process
 if __name__ == '__main__':
+    uvloop.install()
+    loop = asyncio.get_event_loop()
+
+    logging.getLogger('discord').setLevel(logging.INFO)
+    logging.getLogger('discord.http').setLevel(logging.WARNING)
+
+    # root logger
+    setup_logger(None, logging.INFO, 'logs/bot.log', propagate=True)
+
+    # tickets logger
+    setup_logger('tickets', logging.INFO, 'logs/tickets.log', propagate=False)
+
     loop.run_until_complete(main())
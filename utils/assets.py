@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Tuple
+
+from PIL import Image, ImageFont
+
+from utils.image import load_font
+
+log = logging.getLogger(__name__)
+
+FONTS = (
+    ('normal', 16),
+    ('normal', 20),
+    ('normal', 22),
+    ('normal', 24),
+    ('normal', 26),
+    ('normal', 30),
+    ('normal', 32),
+    ('normal', 36),
+    ('normal', 40),
+    ('normal', 46),
+    ('bold', 34),
+    ('bold', 48),
+)
+
+
+class AssetRegistry:
+    """Decodes fonts and images from the assets directory once and hands out copies.
+
+    Map backgrounds are only loaded on demand and kept in a bounded LRU since there are too many of them.
+    """
+
+    def __init__(self, path: str, *, max_maps: int=64):
+        self.path = path
+        self.max_maps = max_maps
+
+        self._images = {}
+        self._tiles = {}
+        self._maps = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _open(self, name: str) -> Image.Image:
+        img = Image.open(f'{self.path}/{name}.png')
+        img.load()
+        return img
+
+    def preload(self, fonts: Iterable[Tuple[str, int]]=FONTS):
+        for directory in ('profile_backgrounds', 'flags', 'tiles', 'memes'):
+            for filename in os.listdir(f'{self.path}/{directory}'):
+                name, ext = os.path.splitext(filename)
+                if ext == '.png':
+                    self._images[f'{directory}/{name}'] = self._open(f'{directory}/{name}')
+
+        for name in ('points_background', 'hours_background'):
+            self._images[name] = self._open(name)
+
+        for name, size in fonts:
+            self.font(name, size)
+
+        log.info('Preloaded %d images and %d fonts', len(self._images), len(fonts))
+
+    def font(self, name: str, size: int) -> ImageFont.FreeTypeFont:
+        return load_font(f'{self.path}/fonts/{name}.ttf', size)
+
+    def _get(self, name: str) -> Image.Image:
+        try:
+            return self._images[name]
+        except KeyError:
+            img = self._images[name] = self._open(name)
+            return img
+
+    def image(self, name: str) -> Image.Image:
+        return self._get(name).copy()
+
+    def flag(self, country: str) -> Image.Image:
+        # flags and tiles are only ever composited onto other images, no need to copy them
+        try:
+            return self._get(f'flags/{country}')
+        except FileNotFoundError:
+            return self._get('flags/UNK')
+
+    def tile(self, name: str, size: int) -> Image.Image:
+        key = (name, size)
+        try:
+            return self._tiles[key]
+        except KeyError:
+            tile = self._tiles[key] = self._get(f'tiles/{name}').resize((size, size))
+            return tile
+
+    def map_background(self, name: str) -> Image.Image:
+        with self._lock:
+            try:
+                self._maps.move_to_end(name)
+                return self._maps[name].copy()
+            except KeyError:
+                pass
+
+        img = self._open(f'map_backgrounds/{name}')
+
+        with self._lock:
+            self._maps[name] = img
+            while len(self._maps) > self.max_maps:
+                self._maps.popitem(last=False)
+
+        return img.copy()
+
+
+assets = AssetRegistry('data/assets')
+
+
+def preload():
+    # used as process pool initializer, a bound method would pickle the whole registry
+    try:
+        assets.preload()
+    except OSError:
+        log.exception('Failed to preload assets')
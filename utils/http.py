@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import hashlib
+import json
+import logging
+import time
+from typing import Any, Optional
+
+import aiohttp
+
+log = logging.getLogger(__name__)
+
+TIMEOUT = aiohttp.ClientTimeout(total=5)
+
+
+class CacheEntry:
+    __slots__ = ('data', 'digest', 'etag', 'last_modified', 'fetched', 'generation')
+
+    def __init__(self, data: Any, digest: bytes, etag: Optional[str], last_modified: Optional[str], generation: int):
+        self.data = data
+        self.digest = digest
+        self.etag = etag
+        self.last_modified = last_modified
+        self.fetched = time.monotonic()
+        # only changes when the payload does, lets callers skip rebuilding anything derived from it
+        self.generation = generation
+
+
+class HTTPCache:
+    """Caches parsed JSON responses for `ttl` seconds and revalidates them with If-None-Match/If-Modified-Since.
+
+    Concurrent requests for the same URL share a single fetch. A 304 response keeps the parsed data of the previous one.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, *, ttl: float=30.0):
+        self.session = session
+        self.ttl = ttl
+
+        self._entries = {}
+        self._inflight = {}
+
+    async def _fetch(self, url: str) -> CacheEntry:
+        entry = self._entries.get(url)
+
+        headers = {}
+        if entry is not None:
+            if entry.etag is not None:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified is not None:
+                headers['If-Modified-Since'] = entry.last_modified
+
+        async with self.session.get(url, headers=headers, timeout=TIMEOUT) as resp:
+            if resp.status == 304 and entry is not None:
+                entry.fetched = time.monotonic()
+                return entry
+
+            resp.raise_for_status()
+            body = await resp.read()
+            etag = resp.headers.get('ETag')
+            last_modified = resp.headers.get('Last-Modified')
+
+        # servers without validators send the same body again, that must not count as a new generation
+        digest = hashlib.sha1(body).digest()
+        if entry is not None and entry.digest == digest:
+            entry.etag = etag
+            entry.last_modified = last_modified
+            entry.fetched = time.monotonic()
+            return entry
+
+        generation = 0 if entry is None else entry.generation + 1
+        entry = self._entries[url] = CacheEntry(json.loads(body), digest, etag, last_modified, generation)
+        log.debug('Fetched %s (generation %d)', url, generation)
+        return entry
+
+    async def get(self, url: str, *, ttl: Optional[float]=None) -> CacheEntry:
+        ttl = self.ttl if ttl is None else ttl
+
+        entry = self._entries.get(url)
+        if entry is not None and time.monotonic() - entry.fetched < ttl:
+            return entry
+
+        fut = self._inflight.get(url)
+        if fut is None:
+            fut = self._inflight[url] = asyncio.ensure_future(self._fetch(url))
+            fut.add_done_callback(lambda _: self._inflight.pop(url, None))
+
+        # a cancelled caller must not cancel the fetch the others are waiting for
+        return await asyncio.shield(fut)
+
+    async def get_json(self, url: str, *, ttl: Optional[float]=None) -> Any:
+        entry = await self.get(url, ttl=ttl)
+        return entry.data
+
+    def invalidate(self, url: str):
+        entry = self._entries.get(url)
+        if entry is not None:
+            entry.fetched = float('-inf')
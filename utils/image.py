@@ -1,3 +1,4 @@
+import functools
 from io import BytesIO
 from typing import Callable, List, Tuple, Union
 
@@ -13,6 +14,7 @@ def save(img: Image.Image) -> BytesIO:
 def center(size: int, area_size: int=0) -> int:
     return int((area_size - size) / 2)
 
+@functools.lru_cache(maxsize=256)
 def round_rectangle(size: Tuple[int, int], radius: int, *, color: Tuple[int, int, int, int]) -> Image.Image:
     width, height = size
 
@@ -31,17 +33,36 @@ def round_rectangle(size: Tuple[int, int], radius: int, *, color: Tuple[int, int
     rect.paste(corner.rotate(180), (width - radius, height - radius))   # lower right
     rect.paste(corner.rotate(270), (width - radius, 0))                 # upper right
 
+    # cached and shared between callers, only ever composite the result onto something else
     return rect.resize(size, resample=Image.LANCZOS, reducing_gap=1.0)  # antialiasing
 
+@functools.lru_cache(maxsize=None)
+def load_font(path: str, size: int) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(path, size)
+
+@functools.lru_cache(maxsize=4096)
+def text_width(font: ImageFont.FreeTypeFont, text: str) -> int:
+    # fonts hash by identity, which is fine since they all come from load_font
+    return font.getsize(text)[0]
+
 def auto_font(font: Union[ImageFont.FreeTypeFont, Tuple[str, int]], text: str, max_width: int,
               *, check: Callable=lambda w, _: w) -> ImageFont.FreeTypeFont:
     if isinstance(font, tuple):
-        font = ImageFont.truetype(*font)
+        font = load_font(*font)
 
-    while check(font.getsize(text)[0], font.size) > max_width:
-        font = ImageFont.truetype(font.path, font.size - 1)
+    if check(text_width(font, text), font.size) <= max_width:
+        return font
+
+    # binary search the biggest size that still fits
+    low, high = 1, font.size - 1
+    while low < high:
+        size = (low + high + 1) // 2
+        if check(text_width(load_font(font.path, size), text), size) <= max_width:
+            low = size
+        else:
+            high = size - 1
 
-    return font
+    return load_font(font.path, low)
 
 def wrap_new(canv: ImageDraw.Draw, box: Tuple[Tuple[int, int], Tuple[int, int]], text: str, *, font: ImageFont.FreeTypeFont):
     _, h = font.getsize('yA')
@@ -59,7 +80,7 @@ def wrap_new(canv: ImageDraw.Draw, box: Tuple[Tuple[int, int], Tuple[int, int]],
     x, y = box[0]
     line = []
     for word in text.split():
-        w, _ = font.getsize(' '.join(line + [word]))
+        w = text_width(font, ' '.join(line + [word]))
 
         if w > max_width:
             write(x, y, line)
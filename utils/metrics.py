@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import abc
+import bisect
+import contextlib
+import logging
+import math
+import time
+from collections import defaultdict
+from typing import Callable, List, Optional, Sequence, Tuple
+
+import aiohttp
+from aiohttp import web
+
+log = logging.getLogger(__name__)
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Tuple[str, str]=None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+
+    if not pairs:
+        return ''
+
+    return '{' + ','.join(f'{n}="{_escape(v)}"' for n, v in pairs) + '}'
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return 'NaN'
+    if math.isinf(value):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(float(value))
+
+
+class Metric(abc.ABC):
+    type = None
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+
+    @abc.abstractmethod
+    def samples(self) -> List[str]:
+        pass
+
+    def render(self) -> str:
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.type}']
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    type = 'counter'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]=()):
+        super().__init__(name, documentation, labels)
+        self._values = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float=1.0):
+        self._values[labels] += amount
+
+    def samples(self) -> List[str]:
+        return [f'{self.name}{_format_labels(self.labels, k)} {_format_value(v)}' for k, v in self._values.items()]
+
+
+class Gauge(Metric):
+    """A value that can go up and down, or is read from `func` whenever the metrics get scraped."""
+
+    type = 'gauge'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]=()):
+        super().__init__(name, documentation, labels)
+        self._values = defaultdict(float)
+        self._func = None
+
+    def set(self, value: float, *labels: str):
+        self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float=1.0):
+        self._values[labels] += amount
+
+    def dec(self, *labels: str, amount: float=1.0):
+        self._values[labels] -= amount
+
+    def set_function(self, func: Callable[[], float]):
+        self._func = func
+
+    def samples(self) -> List[str]:
+        if self._func is not None:
+            return [f'{self.name} {_format_value(self._func())}']
+
+        return [f'{self.name}{_format_labels(self.labels, k)} {_format_value(v)}' for k, v in self._values.items()]
+
+
+class Histogram(Metric):
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str]=(), buckets: Sequence[float]=BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets))
+        # per label set: [bucket counts..., +Inf count], sum
+        self._counts = {}
+        self._sums = defaultdict(float)
+
+    def observe(self, value: float, *labels: str):
+        try:
+            counts = self._counts[labels]
+        except KeyError:
+            counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        self._sums[labels] += value
+
+    @contextlib.contextmanager
+    def time(self, *labels: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def samples(self) -> List[str]:
+        lines = []
+        for labels, counts in self._counts.items():
+            total = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                total += count
+                le = ('le', _format_value(bound))
+                lines.append(f'{self.name}_bucket{_format_labels(self.labels, labels, le)} {total}')
+
+            fmt = _format_labels(self.labels, labels)
+            lines.append(f'{self.name}_sum{fmt} {_format_value(self._sums[labels])}')
+            lines.append(f'{self.name}_count{fmt} {total}')
+
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: Metric) -> Metric:
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return '\n'.join(m.render() for m in self._metrics.values()) + '\n'
+
+
+registry = Registry()
+
+command_duration = registry.register(Histogram(
+    'ddnet_command_duration_seconds', 'Time spent invoking commands', ('command',)))
+event_duration = registry.register(Histogram(
+    'ddnet_event_duration_seconds', 'Time spent in event listeners', ('event', 'listener')))
+render_duration = registry.register(Histogram(
+    'ddnet_render_duration_seconds', 'Time spent rendering images in worker processes', ('function',)))
+render_pending = registry.register(Gauge(
+    'ddnet_render_pending', 'Renders that are running or waiting for a worker'))
+db_acquire_duration = registry.register(Histogram(
+    'ddnet_db_acquire_duration_seconds', 'Time spent waiting for a database connection'))
+http_duration = registry.register(Histogram(
+    'ddnet_http_request_duration_seconds', 'Duration of outgoing HTTP requests', ('host', 'method')))
+http_errors = registry.register(Counter(
+    'ddnet_http_request_errors_total', 'Outgoing HTTP requests that failed', ('host', 'method')))
+gateway_latency = registry.register(Gauge(
+    'ddnet_gateway_latency_seconds', 'Latency between a gateway heartbeat and its acknowledgement'))
+
+
+def http_trace_config() -> aiohttp.TraceConfig:
+    async def on_request_start(session, ctx, params):
+        ctx.start = time.perf_counter()
+
+    async def on_request_end(session, ctx, params):
+        http_duration.observe(time.perf_counter() - ctx.start, params.url.host or '', params.method)
+
+    async def on_request_exception(session, ctx, params):
+        http_errors.inc(params.url.host or '', params.method)
+
+    trace_config = aiohttp.TraceConfig()
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+
+class TimedPool:
+    """Wraps an asyncpg pool to measure how long queries wait for a free connection."""
+
+    def __init__(self, pool):
+        self._pool = pool
+
+    def __getattr__(self, name: str):
+        return getattr(self._pool, name)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self, *, timeout: Optional[float]=None):
+        start = time.perf_counter()
+        async with self._pool.acquire(timeout=timeout) as con:
+            db_acquire_duration.observe(time.perf_counter() - start)
+            yield con
+
+    async def execute(self, query: str, *args, timeout: Optional[float]=None) -> str:
+        async with self.acquire() as con:
+            return await con.execute(query, *args, timeout=timeout)
+
+    async def executemany(self, command: str, args, *, timeout: Optional[float]=None):
+        async with self.acquire() as con:
+            return await con.executemany(command, args, timeout=timeout)
+
+    async def fetch(self, query: str, *args, timeout: Optional[float]=None, **kwargs) -> list:
+        async with self.acquire() as con:
+            return await con.fetch(query, *args, timeout=timeout, **kwargs)
+
+    async def fetchrow(self, query: str, *args, timeout: Optional[float]=None, **kwargs):
+        async with self.acquire() as con:
+            return await con.fetchrow(query, *args, timeout=timeout, **kwargs)
+
+    async def fetchval(self, query: str, *args, column: int=0, timeout: Optional[float]=None):
+        async with self.acquire() as con:
+            return await con.fetchval(query, *args, column=column, timeout=timeout)
+
+    async def copy_records_to_table(self, table_name: str, **kwargs) -> str:
+        async with self.acquire() as con:
+            return await con.copy_records_to_table(table_name, **kwargs)
+
+
+class MetricsServer:
+    """Serves the registry in the Prometheus text format on /metrics."""
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+
+        app = web.Application()
+        app.router.add_get('/metrics', self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        return web.Response(text=registry.render(), content_type='text/plain', charset='utf-8')
+
+    async def start(self):
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        log.info('Serving metrics on %s:%d', self.host, self.port)
+
+    async def close(self):
+        await self._runner.cleanup()
@@ -2,10 +2,11 @@
 # -*- coding: utf-8 -*-
 
 import asyncio
-import functools
+import json
 import os
+import tempfile
 from asyncio.subprocess import PIPE
-from typing import Awaitable, Callable, Tuple, Union
+from typing import Any, Awaitable, Callable, Tuple, Union
 
 SHELL = os.getenv('SHELL')
 
@@ -31,16 +32,21 @@ async def run_process_exec(program: str, *args: str, timeout: float=90.0) -> Tup
     else:
         return stdout.decode(), stderr.decode()
 
-def executor(func: Callable):
-    @functools.wraps(func)
-    async def wrapper(*args, **kwargs):
-        loop = asyncio.get_event_loop()
-        fn = functools.partial(func, *args, **kwargs)
-        return await loop.run_in_executor(None, fn)
-    return wrapper
-
 async def maybe_coroutine(func: Union[Awaitable, Callable], *args, **kwargs):
     if asyncio.iscoroutinefunction(func):
         return await func(*args, **kwargs)
     else:
         return func(*args, **kwargs)
+
+def write_json_atomic(path: str, data: Any):
+    # readers and crashes only ever see the old or the new file, never a partially written one
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or '.', prefix='.tmp-')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from datetime import date
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+def points_line(dates: Sequence[date], points: Sequence[int], *, start: date, end: date, x_mult: float, y_mult: float,
+                bottom: float, width: float) -> np.ndarray:
+    """Maps cumulative points per date to the (N, 2) vertices of a graph line.
+
+    Gaps wider than a tenth of the graph are drawn as a flat line followed by a step instead of a slope.
+    """
+    # converting date objects through ordinals is a lot faster than letting numpy parse them as datetime64
+    days = np.fromiter(map(date.toordinal, dates), dtype=np.int64, count=len(dates)) - start.toordinal()
+    x = days * x_mult
+    y = bottom - np.asarray(points, dtype=np.float64) * y_mult
+
+    prev_x = np.concatenate(([0.0], x[:-1]))
+    prev_y = np.concatenate(([bottom], y[:-1]))
+    gaps = (x - prev_x) / width > 0.1
+
+    # every date gets an optional flat vertex followed by its actual vertex
+    vertices = np.stack((np.column_stack((x, prev_y)), np.column_stack((x, y))), axis=1).reshape(-1, 2)
+    mask = np.column_stack((gaps, np.ones_like(gaps))).ravel()
+
+    parts = [np.array([[0.0, bottom]]), vertices[mask]]
+    if dates[-1] != end:
+        parts.append(np.array([[width, y[-1]]]))
+
+    return np.concatenate(parts)
+
+
+def finishes_per_hour(hours: Sequence[Tuple[int, int]]) -> np.ndarray:
+    hour, finishes = np.asarray(hours, dtype=np.int64).reshape(-1, 2).T
+    return np.bincount(hour, weights=finishes, minlength=24)[:24]
+
+
+def hours_line(finishes: np.ndarray, *, hour_width: float, height: float, offset: float) -> np.ndarray:
+    """Maps 24 finish counts to the (26, 2) vertices of a graph line.
+
+    The first and last vertex wrap around to the neighbouring day, the ones in between mark the hours.
+    """
+    wrapped = np.concatenate((finishes[-1:], finishes, finishes[:1]))
+    x = np.arange(-1, 50, 2, dtype=np.float64) * hour_width
+    y = height * (1 - wrapped / finishes.max()) + offset
+    return np.column_stack((x, y))
+
+
+def layout_labels(positions: Sequence[float], height: float, *, lower: float=float('-inf'),
+                  upper: float=float('inf')) -> List[float]:
+    """Moves labels as little as possible so that they are at least `height` apart and within lower/upper.
+
+    Overlapping labels are merged into runs that get centered on the positions they wanted. Returns the new
+    positions in the order of `positions`.
+    """
+    order = sorted(range(len(positions)), key=positions.__getitem__)
+
+    # each run is [start, count, sum of (wanted position - index in run * height)]
+    runs = []
+    for i in order:
+        runs.append([positions[i], 1, positions[i]])
+        while True:
+            run = runs[-1]
+            run[0] = min(max(run[2] / run[1], lower), upper - (run[1] - 1) * height)
+
+            if len(runs) == 1:
+                break
+
+            prev = runs[-2]
+            if prev[0] + prev[1] * height <= run[0]:
+                break
+
+            prev[2] += run[2] - prev[1] * run[1] * height
+            prev[1] += run[1]
+            runs.pop()
+
+    out = [0.0] * len(positions)
+    it = iter(order)
+    for start, count, _ in runs:
+        for j in range(count):
+            out[next(it)] = start + j * height
+
+    return out
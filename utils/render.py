@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import functools
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable
+
+from utils import metrics
+from utils.assets import preload
+
+log = logging.getLogger(__name__)
+
+
+class RenderQueueFull(Exception):
+    pass
+
+
+def _ping() -> bool:
+    return True
+
+
+class RenderPool:
+    """Runs blocking Pillow renders in worker processes that have all assets preloaded.
+
+    At most `workers` renders are handed to the processes at once, another `queue` callers may wait for a free
+    worker and everything beyond that is rejected with `RenderQueueFull`.
+    """
+
+    def __init__(self, workers: int=2, queue: int=8):
+        self.workers = workers
+        self.queue = queue
+        self.pending = 0
+
+        self._executor = self._create_executor()
+        self._semaphore = asyncio.Semaphore(workers)
+
+        metrics.render_pending.set_function(lambda: self.pending)
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        context = multiprocessing.get_context('spawn')
+        return ProcessPoolExecutor(self.workers, mp_context=context, initializer=preload)
+
+    async def warmup(self):
+        loop = asyncio.get_event_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+        log.info('Started %d render workers', self.workers)
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        if self.pending >= self.workers + self.queue:
+            raise RenderQueueFull()
+
+        self.pending += 1
+        try:
+            async with self._semaphore:
+                loop = asyncio.get_event_loop()
+                fn = functools.partial(func, *args, **kwargs)
+                executor = self._executor
+                with metrics.render_duration.time(func.__name__):
+                    try:
+                        return await loop.run_in_executor(executor, fn)
+                    except BrokenProcessPool:
+                        # a worker died (e.g. killed for using too much memory), only this call fails
+                        if executor is self._executor:
+                            log.error('Render worker died, restarting render pool')
+                            executor.shutdown(wait=False)
+                            self._executor = self._create_executor()
+                        raise
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
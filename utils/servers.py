@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import logging
+from typing import Dict, Optional
+
+from utils.http import HTTPCache
+
+log = logging.getLogger(__name__)
+
+INFO_URL = 'https://info.ddnet.org/info'
+
+# checked in this order, the first category an address appears in wins
+CATEGORIES = (
+    ('ddnet', 'servers', ('DDNet', 'Test', 'Tutorial')),
+    ('ddnet-pvp', 'servers', ('Block', 'Infection', 'iCTF', 'gCTF', 'Vanilla', 'zCatch', 'TeeWare', 'Foot', 'xPanic',
+                              'Monster')),
+    ('kog', 'servers-kog', ('Gores', 'TestGores')),
+    ('fng', 'servers', ('FNG',)),
+)
+
+
+def build_index(data: dict) -> Dict[str, str]:
+    index = {}
+    for category, network, tags in CATEGORIES:
+        for location in data.get(network) or ():
+            servers = location.get('servers') or {}
+            for tag in tags:
+                for address in servers.get(tag) or ():
+                    index.setdefault(address, category)
+
+    return index
+
+
+class ServerIndex:
+    """Maps ip:port addresses of the servers listed on info.ddnet.org to ddnet, ddnet-pvp, kog or fng.
+
+    The index is only rebuilt when the cached info response actually changed.
+    """
+
+    def __init__(self, http_cache: HTTPCache, *, ttl: float=300.0):
+        self.http_cache = http_cache
+        self.ttl = ttl
+
+        self._index = {}
+        self._generation = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._generation is not None
+
+    async def refresh(self):
+        entry = await self.http_cache.get(INFO_URL, ttl=self.ttl)
+        if entry.generation == self._generation:
+            return
+
+        self._index = build_index(entry.data)
+        self._generation = entry.generation
+        log.info('Indexed %d server addresses', len(self._index))
+
+    async def classify(self, address: str) -> Optional[str]:
+        if not self.loaded:
+            await self.refresh()
+
+        return self._index.get(address)
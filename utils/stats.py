@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import time
+from collections import Counter, deque
+from datetime import datetime
+from typing import Optional
+
+import asyncpg
+
+log = logging.getLogger(__name__)
+
+COLUMNS = ('guild_id', 'channel_id', 'author_id', 'timestamp', 'command')
+
+RETENTION_DAYS = 90
+PRUNE_INTERVAL = 24 * 60 * 60
+
+
+class CommandStatsWriter:
+    """Collects stats_commands rows in memory and writes them in batches with COPY.
+
+    Rows are flushed every `interval` seconds or as soon as `batch_size` of them are buffered. While the database is
+    unreachable at most `max_rows` rows are kept, the oldest ones get dropped first.
+
+    Every batch is also added to the stats_commands_daily rollup in the same transaction, which lets raw rows be
+    pruned after `RETENTION_DAYS`. Until the rollup table exists (see data/tools/backfill_command_stats.psql) nothing
+    is written or pruned, rows stay buffered instead.
+    """
+
+    def __init__(self, pool, *, interval: float=30.0, batch_size: int=200, max_rows: int=10000):
+        self.pool = pool
+        self.interval = interval
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+
+        self.dropped = 0
+
+        self._rows = deque(maxlen=max_rows)
+        self._lock = asyncio.Lock()
+        self._task = None
+        self._flush_task = None
+        self._last_prune = None
+        self._has_rollup = False
+
+    def add(self, guild_id: Optional[int], channel_id: int, author_id: int, timestamp: datetime, command: str):
+        if len(self._rows) == self.max_rows:
+            self.dropped += 1
+
+        self._rows.append((guild_id, channel_id, author_id, timestamp, command))
+
+        if len(self._rows) >= self.batch_size and (self._flush_task is None or self._flush_task.done()):
+            self._flush_task = asyncio.ensure_future(self.flush())
+
+    async def _write(self, con: asyncpg.Connection, rows: list):
+        await con.copy_records_to_table('stats_commands', records=rows, columns=COLUMNS)
+
+        daily = Counter((t.date(), g or 0, c, cmd) for g, c, _, t, cmd in rows)
+        query = """INSERT INTO stats_commands_daily (day, guild_id, channel_id, command, uses)
+                   VALUES ($1, $2, $3, $4, $5)
+                   ON CONFLICT (day, guild_id, channel_id, command) DO UPDATE
+                   SET uses = stats_commands_daily.uses + EXCLUDED.uses;
+                """
+        await con.executemany(query, [(*k, v) for k, v in daily.items()])
+
+    async def check_rollup(self) -> bool:
+        if not self._has_rollup:
+            try:
+                self._has_rollup = await self.pool.fetchval("SELECT to_regclass('stats_commands_daily') IS NOT NULL;")
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError):
+                log.exception('Failed to look up stats_commands_daily')
+                return False
+
+            if not self._has_rollup:
+                log.warning('stats_commands_daily does not exist, run data/tools/backfill_command_stats.psql. '
+                            'Command stats are buffered until then (%d rows)', len(self._rows))
+
+        return self._has_rollup
+
+    async def prune(self):
+        if not await self.check_rollup():
+            return
+
+        query = "DELETE FROM stats_commands WHERE timestamp < NOW() AT TIME ZONE 'UTC' - make_interval(days => $1);"
+        try:
+            status = await self.pool.execute(query, RETENTION_DAYS)
+        except (OSError, asyncio.TimeoutError, asyncpg.PostgresError, asyncpg.InterfaceError):
+            log.exception('Failed to prune command stats')
+        else:
+            self._last_prune = time.monotonic()
+            log.info('Pruned command stats older than %d days: %s', RETENTION_DAYS, status)
+
+    async def flush(self):
+        async with self._lock:
+            if not self._rows or not await self.check_rollup():
+                return
+
+            rows = list(self._rows)
+            self._rows.clear()
+
+            try:
+                async with self.pool.acquire() as con:
+                    async with con.transaction():
+                        await self._write(con, rows)
+            except (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError):
+                log.exception('Failed to write %d command stats rows, retrying later (%d dropped so far)',
+                              len(rows), self.dropped)
+                # put them back in front of anything that got added in the meantime, dropping the oldest on overflow
+                self.dropped += max(0, len(rows) + len(self._rows) - self.max_rows)
+                self._rows = deque(rows + list(self._rows), maxlen=self.max_rows)
+            except asyncpg.PostgresError:
+                # the batch itself is bad, retrying it would block every row after it
+                log.exception('Dropping %d command stats rows: %r', len(rows), rows)
+                self.dropped += len(rows)
+            else:
+                log.debug('Wrote %d command stats rows', len(rows))
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            # cancelling the task in close() must not abort a flush that already took rows off the queue
+            await asyncio.shield(self.flush())
+
+            if self._last_prune is None or time.monotonic() - self._last_prune > PRUNE_INTERVAL:
+                await self.prune()
+
+    def start(self):
+        self._task = asyncio.ensure_future(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+
+        await self.flush()
@@ -1,79 +1,203 @@
 # transcript.py: Collects all messages from a channel and writes them to a file.
+import asyncio
+import email.utils
+import logging
+import os
+import tempfile
 import zipfile
+from datetime import datetime, timezone
+
+import aiohttp
+
+log = logging.getLogger(__name__)
 
 MAX_ZIP_SIZE = 80 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+DOWNLOAD_CONCURRENCY = 4
+DOWNLOAD_ATTEMPTS = 4
+
+ATTACHMENT_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif',
+                         '.mp4', '.avi', '.mkv', '.webm',
+                         '.demo', '.map' '.txt', '.log', '.RTP')
+
+
+def retry_after(value, default: float) -> float:
+    # Retry-After is either a number of seconds or an HTTP date
+    if value is None:
+        return default
+
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return default
+
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+class AttachmentZips:
+    """Writes attachments into numbered zip files that are rotated before they'd exceed MAX_ZIP_SIZE."""
+
+    def __init__(self, base: str):
+        self.base = base
+        self.files = []
+        self._zip = None
+        self._size = 0
+
+    def _rotate(self):
+        if self._zip is not None:
+            self._zip.close()
+
+        self.files.append(f"{self.base}_{len(self.files) + 1}.zip")
+        self._zip = zipfile.ZipFile(self.files[-1], 'w', zipfile.ZIP_STORED)
+        self._size = 0
+
+    def write(self, path: str, name: str, size: int):
+        if self._zip is None or self._size + size > MAX_ZIP_SIZE:
+            self._rotate()
+
+        self._size += size
+        self._zip.write(path, name)
+
+    def close(self):
+        if self._zip is not None:
+            self._zip.close()
+            self._zip = None
+
+
+class AttachmentDownloader:
+    """Downloads attachments to temporary files with at most DOWNLOAD_CONCURRENCY requests at a time.
+
+    Downloads start as soon as they are added so they overlap with paging through the channel history. Rate limited
+    and failed requests are retried, honouring Retry-After.
+    """
+
+    def __init__(self, session: aiohttp.ClientSession, directory: str):
+        self.session = session
+        self.directory = directory
+        self._semaphore = asyncio.Semaphore(DOWNLOAD_CONCURRENCY)
+        self._downloads = []
+
+    def add(self, name: str, attachment):
+        fd, path = tempfile.mkstemp(dir=self.directory, prefix='.download-')
+        os.close(fd)
+        task = asyncio.ensure_future(self._download(attachment.url, path))
+        self._downloads.append((name, attachment.size, path, task))
+
+    async def _download(self, url: str, path: str):
+        async with self._semaphore:
+            for attempt in range(DOWNLOAD_ATTEMPTS):
+                delay = 2 ** attempt
+                try:
+                    async with self.session.get(url) as resp:
+                        if resp.status == 429 or resp.status >= 500:
+                            delay = retry_after(resp.headers.get('Retry-After'), delay)
+                        else:
+                            resp.raise_for_status()
+                            with open(path, 'wb') as f:
+                                async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                                    f.write(chunk)
+                            return
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt == DOWNLOAD_ATTEMPTS - 1:
+                        raise
+
+                if attempt < DOWNLOAD_ATTEMPTS - 1:
+                    await asyncio.sleep(delay)
+
+            raise RuntimeError(f'Giving up on {url} after {DOWNLOAD_ATTEMPTS} attempts')
+
+    async def completed(self):
+        """Yields (name, size, path) in the order the attachments were added, skipping failed downloads."""
+        for name, size, path, task in self._downloads:
+            try:
+                await task
+            except (aiohttp.ClientError, asyncio.TimeoutError, RuntimeError):
+                log.exception('Failed to download attachment %r', name)
+            else:
+                yield name, size, path
+
+    def cleanup(self):
+        for _, _, path, task in self._downloads:
+            task.cancel()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+        self._downloads.clear()
+
 
 async def transcript(bot, ticket_channel):
-    messages = []
-    attachments = []
-    zipped_files = []
+    line_count = 0
     attachments_names = set()
     transcript_file = f'data/ticket-system/transcripts-temp/{ticket_channel.name}-{ticket_channel.id}.txt'
     attachment_zip_base = f'data/ticket-system/attachments-temp/attachments-{ticket_channel.name}-{ticket_channel.id}'
+    zips = AttachmentZips(attachment_zip_base)
+    downloads = AttachmentDownloader(bot.session, os.path.dirname(attachment_zip_base))
 
     channel = await bot.fetch_channel(ticket_channel.id)
 
-    await ticket_channel.send(f'Collecting messages...')
-    async for message in channel.history(limit=None, oldest_first=True):
-        if message.author.bot:
-            continue
-
-        created_at = message.created_at.replace(microsecond=0, tzinfo=None)
-        content = f"{created_at} {message.author}: {message.content}"
-
-        if message.attachments:
-            for attachment in message.attachments:
-                attachment_name = attachment.filename
-
-                if attachment_name in attachments_names:
-                    base_name, extension = attachment_name.rsplit('.', 1)
-                    counter = 1
-                    while f"{base_name}_{counter}.{extension}" in attachments_names:
-                        counter += 1
-                    attachment_name = f"{base_name}_{counter}.{extension}"
-
-                attachments_names.add(attachment_name)
-
-                if attachment.filename.endswith(
-                        ('.jpg', '.jpeg', '.png', '.gif',
-                         '.mp4', '.avi', '.mkv', '.webm',
-                         '.demo', '.map' '.txt', '.log', '.RTP')):
-                    attachments.append((attachment_name, await attachment.read()))
-
-                content += f"\nAttachments:\n{attachment_name}"
-
-        messages.append(content)
-
-    if len(messages) >= 2:
-        transcript_data = "\n".join(messages)
+    # lines go to disk as they come in and attachments download in the background, nothing is held in memory
+    try:
         with open(transcript_file, "w", encoding="utf-8") as transcript:
-            transcript.write(transcript_data)
-    else:
-        await ticket_channel.send(f'No messages found...')
+            async for message in channel.history(limit=None, oldest_first=True):
+                if message.author.bot:
+                    continue
+
+                created_at = message.created_at.replace(microsecond=0, tzinfo=None)
+                content = f"{created_at} {message.author}: {message.content}"
+
+                if message.attachments:
+                    for attachment in message.attachments:
+                        attachment_name = attachment.filename
+
+                        if attachment_name in attachments_names:
+                            base_name, extension = attachment_name.rsplit('.', 1)
+                            counter = 1
+                            while f"{base_name}_{counter}.{extension}" in attachments_names:
+                                counter += 1
+                            attachment_name = f"{base_name}_{counter}.{extension}"
+
+                        attachments_names.add(attachment_name)
+
+                        if attachment.filename.endswith(ATTACHMENT_EXTENSIONS):
+                            downloads.add(attachment_name, attachment)
+
+                        content += f"\nAttachments:\n{attachment_name}"
+
+                if line_count:
+                    transcript.write("\n")
+                transcript.write(content)
+                line_count += 1
+
+        loop = asyncio.get_event_loop()
+        async for attachment_name, size, path in downloads.completed():
+            # copying up to MAX_ZIP_SIZE bytes would block the event loop
+            await loop.run_in_executor(None, zips.write, path, attachment_name, size)
+            os.remove(path)
+    except BaseException:
+        # a failed transcript doesn't leave partial files behind
+        zips.close()
+        for file_path in [transcript_file] + zips.files:
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                pass
+        raise
+    finally:
+        zips.close()
+        downloads.cleanup()
+
+    if line_count < 2:
+        os.remove(transcript_file)
         transcript_file = None
 
-    if attachments:
-        await ticket_channel.send(f'Compressing files...')
-        zip_number = 1
-        current_zip_size = 0
-        current_zip = None
-
-        for attachment_name, file_data in attachments:
-            if current_zip is None or current_zip_size + len(file_data) > MAX_ZIP_SIZE:
-                if current_zip is not None:
-                    current_zip.close()
-                    zipped_files.append(f"{attachment_zip_base}_{zip_number}.zip")
-                    zip_number += 1
-                current_zip_size = 0
-                current_zip = zipfile.ZipFile(f"{attachment_zip_base}_{zip_number}.zip", 'w', zipfile.ZIP_STORED)
-
-            current_zip.writestr(attachment_name, file_data)
-            current_zip_size += len(file_data)
-
-        if current_zip is not None:
-            current_zip.close()
-            zipped_files.append(f"{attachment_zip_base}_{zip_number}.zip")
-    else:
-        zipped_files = None
-
+    zipped_files = zips.files or None
     return transcript_file, zipped_files